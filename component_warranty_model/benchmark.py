@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+
+import spacy
+
+from component_warranty_model.data_files import load_descriptions
+from component_warranty_model.model_registry import (
+    MODEL_LOAD_PROFILE,
+    available_brands,
+    load_model,
+)
+from component_warranty_model.worker_pool import create_process_pool
+
+# Benchmark every brand model on the descriptions kept under Data/<brand>:
+# cold-load time, single-call latency percentiles, nlp.pipe throughput at
+# several batch sizes, the memory taken by the model and peak RSS. Each
+# brand runs in a fresh process so its load time and memory are not
+# affected by the brands before it. BLAS/OpenMP threads are left uncapped,
+# as in the serving process, unless --threads is given.
+#
+#   python -m component_warranty_model.benchmark [Brand ...] [--threads N] \
+#       [--output results.json] [--baseline previous.json]
+
+DEFAULT_BATCH_SIZES = "1,8,32,128,512"
+DEFAULT_SAMPLES = 500
+
+# Metrics compared against a baseline run, besides pipe throughput. A
+# positive change in these is a regression; in throughput, an improvement.
+COMPARED_METRICS = (
+    "load_seconds",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "model_rss_mb",
+    "peak_rss_mb",
+)
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an already sorted list."""
+    rank = round(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values) - 1, max(0, rank - 1))]
+
+
+def peak_rss_mb():
+    """Return this process's peak resident set size in MB (Linux reports KB)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def current_rss_mb():
+    """Return this process's current resident set size in MB (Linux only)."""
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def benchmark_brand(brand, texts, profile, batch_sizes):
+    """Measure one brand model; meant to run in a fresh worker process."""
+    rss_before_load = current_rss_mb()
+    start = time.perf_counter()
+    nlp = load_model(brand, profile)
+    load_seconds = time.perf_counter() - start
+    first_call_start = time.perf_counter()
+    nlp("warm up")
+    first_call_seconds = time.perf_counter() - first_call_start
+    model_rss = current_rss_mb() - rss_before_load
+
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        nlp(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for _ in nlp.pipe(texts, batch_size=batch_size):
+            pass
+        elapsed = time.perf_counter() - start
+        throughput[str(batch_size)] = round(len(texts) / elapsed, 1)
+
+    return {
+        "profile": profile,
+        "pipeline": list(nlp.pipe_names),
+        "texts": len(texts),
+        "load_seconds": round(load_seconds, 3),
+        "first_call_ms": round(first_call_seconds * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "pipe_docs_per_second": throughput,
+        "model_rss_mb": round(model_rss, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmark(
+    brands,
+    profile=MODEL_LOAD_PROFILE,
+    samples=DEFAULT_SAMPLES,
+    batch_sizes=(1,),
+    threads=None,
+):
+    """Benchmark each brand in its own process and collect the results.
+
+    Descriptions are read here, so that parsing the workbooks does not
+    count towards the peak RSS of the process measuring the model.
+    """
+    results = {}
+    for brand in brands:
+        texts = load_descriptions(brand, samples)
+        if not texts:
+            results[brand] = {"error": f"No descriptions found for brand '{brand}'."}
+            print(f"{brand}: {json.dumps(results[brand])}")
+            continue
+
+        with create_process_pool(1, threads_per_worker=threads) as pool:
+            try:
+                results[brand] = pool.submit(
+                    benchmark_brand, brand, texts, profile, list(batch_sizes)
+                ).result()
+            except Exception as e:
+                results[brand] = {"error": str(e)}
+        print(f"{brand}: {json.dumps(results[brand])}")
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "spacy": spacy.__version__,
+        "cpu_count": os.cpu_count(),
+        "profile": profile,
+        "samples": samples,
+        "batch_sizes": list(batch_sizes),
+        "threads": threads,
+        "brands": results,
+    }
+
+
+def compare_runs(baseline, current):
+    """Return the relative change of each metric against a baseline run."""
+    changes = {}
+    for brand, result in current["brands"].items():
+        previous = baseline.get("brands", {}).get(brand)
+        if not previous or "error" in previous or "error" in result:
+            continue
+
+        brand_changes = {
+            metric: relative_change(previous.get(metric), result.get(metric))
+            for metric in COMPARED_METRICS
+        }
+        for batch_size, docs_per_second in result["pipe_docs_per_second"].items():
+            brand_changes[f"pipe_docs_per_second[{batch_size}]"] = relative_change(
+                previous.get("pipe_docs_per_second", {}).get(batch_size),
+                docs_per_second,
+            )
+        changes[brand] = {k: v for k, v in brand_changes.items() if v is not None}
+    return changes
+
+
+def relative_change(before, after):
+    if not before or after is None:
+        return None
+    return round((after - before) / before, 4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m component_warranty_model.benchmark",
+        description="Benchmark brand NER models on their historical descriptions.",
+    )
+    parser.add_argument("brands", nargs="*", help="brands to run (default: all)")
+    parser.add_argument("--profile", default=MODEL_LOAD_PROFILE)
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--batch-sizes", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument(
+        "--threads", type=int, help="cap BLAS/OpenMP threads (default: uncapped)"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.brands or available_brands(),
+        args.profile,
+        args.samples,
+        [int(size) for size in args.batch_sizes.split(",")],
+        args.threads,
+    )
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["changes"] = compare_runs(json.load(f), report)
+        print(json.dumps(report["changes"], indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,101 @@
+import json
+import statistics
+import sys
+import time
+
+import spacy
+
+from component_warranty_model.data_files import load_labelled_examples
+from component_warranty_model.model_registry import model_size_bytes
+from component_warranty_model.training_corpus import split_dev_rows
+
+# Compare two model artifacts for one brand on size, load time, latency and
+# accuracy against the labelled model codes kept under Data/<brand>. Accuracy
+# is measured on the rows split_dev_rows holds out, which a training on the
+# same rows never learns from. A retrain keeps the model it replaced in
+# spaCy/<brand>/previous_model.
+#
+#   python -m component_warranty_model.compare_ner_artifacts <brand> \
+#       <baseline_model_dir> <candidate_model_dir> [report.json]
+
+
+def measure_artifact(path, texts, codes, held_out):
+    """Measure a single model directory on the given labelled texts.
+
+    Accuracy only counts the texts whose held_out flag is set.
+    """
+    start = time.perf_counter()
+    nlp = spacy.load(path)
+    load_seconds = time.perf_counter() - start
+
+    latencies, predictions = [], []
+    for text in texts:
+        start = time.perf_counter()
+        doc = nlp(text)
+        latencies.append(time.perf_counter() - start)
+        predictions.append([ent.text for ent in doc.ents if ent.label_ == "MODEL"])
+
+    start = time.perf_counter()
+    list(nlp.pipe(texts, batch_size=256))
+    pipe_seconds = time.perf_counter() - start
+
+    exact = sum(
+        1
+        for predicted, code, is_held_out in zip(predictions, codes, held_out)
+        if is_held_out and predicted and predicted[0].upper() == code.upper()
+    )
+    latencies.sort()
+    return {
+        "path": path,
+        "pipeline": nlp.pipe_names,
+        "size_mb": round(model_size_bytes(path) / (1024 * 1024), 2),
+        "load_seconds": round(load_seconds, 3),
+        "mean_latency_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p95_latency_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        "pipe_docs_per_second": round(len(texts) / pipe_seconds, 1),
+        "exact_match_accuracy": round(exact / sum(held_out), 4),
+    }, predictions
+
+
+def compare_artifacts(brand, baseline_path, candidate_path):
+    """Build a side-by-side report for two artifacts of the same brand."""
+    labelled = load_labelled_examples(brand).reset_index(drop=True)
+    if labelled.empty:
+        raise ValueError(f"No labelled descriptions found for brand '{brand}'.")
+    _, held_out_rows = split_dev_rows(labelled)
+    if held_out_rows.empty:
+        raise ValueError(f"Too few labelled descriptions for brand '{brand}'.")
+    texts = labelled["Model Description"].tolist()
+    codes = labelled["Model Code"].tolist()
+    held_out = labelled.index.isin(held_out_rows.index).tolist()
+
+    baseline, baseline_predictions = measure_artifact(
+        baseline_path, texts, codes, held_out
+    )
+    candidate, candidate_predictions = measure_artifact(
+        candidate_path, texts, codes, held_out
+    )
+    agreement = sum(
+        1 for a, b in zip(baseline_predictions, candidate_predictions) if a == b
+    )
+    return {
+        "brand": brand,
+        "examples": len(texts),
+        "held_out_examples": sum(held_out),
+        "baseline": baseline,
+        "candidate": candidate,
+        "prediction_agreement": round(agreement / len(texts), 4),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        sys.exit(
+            "usage: python -m component_warranty_model.compare_ner_artifacts "
+            "<brand> <baseline_model_dir> <candidate_model_dir> [report.json]"
+        )
+    report = compare_artifacts(*sys.argv[1:4])
+    print(json.dumps(report, indent=2))
+    if len(sys.argv) > 4:
+        with open(sys.argv[4], "w") as f:
+            json.dump(report, f, indent=2)
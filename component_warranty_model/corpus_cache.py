@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+import spacy
+
+from component_warranty_model.training_corpus import (
+    CORPUS_INDEX,
+    INFIX_PATTERN,
+    TRAIN_DEV_FRACTION,
+    TRAIN_DEV_MAX_ROWS,
+    TRAIN_DEV_MIN_ROWS,
+    ShardedCorpus,
+)
+
+# Aligned training corpora are kept per uploaded file under CORPUS_CACHE_DIR,
+# so retraining on an unchanged sheet skips parsing it and aligning its rows.
+# An empty CORPUS_CACHE_DIR disables the cache.
+CORPUS_CACHE_DIR = os.getenv(
+    "CORPUS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ner_corpus_cache")
+)
+CORPUS_CACHE_KEPT = int(os.getenv("CORPUS_CACHE_KEPT", "20"))
+
+# Bump when the alignment rules or the corpus layout change, so older
+# corpora are not reused.
+CORPUS_FORMAT_VERSION = 3
+
+
+class CorpusCache:
+    """Store the aligned corpus of each brand of an uploaded training file.
+
+    An entry is keyed by the content hash of the upload, the tokenizer
+    and dev split configuration and the spaCy version. It holds a manifest listing the
+    file's brands and, per brand, a directory with the sharded corpus and
+    the unmatched rows. Training streams straight from that directory.
+    """
+
+    def __init__(self, root=CORPUS_CACHE_DIR, kept=CORPUS_CACHE_KEPT):
+        self.root = root
+        self.kept = kept
+
+    def key(self, source_hash):
+        """Return the cache key for an upload with the given content hash."""
+        config = [
+            source_hash,
+            INFIX_PATTERN,
+            [TRAIN_DEV_FRACTION, TRAIN_DEV_MIN_ROWS, TRAIN_DEV_MAX_ROWS],
+            spacy.__version__,
+            CORPUS_FORMAT_VERSION,
+        ]
+        return hashlib.sha256(json.dumps(config).encode()).hexdigest()[:32]
+
+    def brands(self, key):
+        """Return the brands of a fully cached upload, or None."""
+        try:
+            with open(os.path.join(self.root, key, "manifest.json")) as f:
+                brands = json.load(f)["brands"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if not all(self.has(key, brand) for brand in brands):
+            return None
+        os.utime(os.path.join(self.root, key))
+        return brands
+
+    def record_brands(self, key, brands):
+        """Write the manifest of an upload and drop the oldest entries."""
+        os.makedirs(os.path.join(self.root, key), exist_ok=True)
+        self._write(
+            os.path.join(self.root, key, "manifest.json"),
+            lambda path: self._dump_json({"brands": [str(b) for b in brands]}, path),
+        )
+        self._prune(key)
+
+    def has(self, key, brand):
+        directory, unmatched_path = self._paths(key, brand)
+        index_path = os.path.join(directory, CORPUS_INDEX)
+        return os.path.exists(index_path) and os.path.exists(unmatched_path)
+
+    def load(self, key, brand):
+        """Return the corpus and unmatched rows of a cached brand, or None."""
+        directory, unmatched_path = self._paths(key, brand)
+        try:
+            return ShardedCorpus(directory), pd.read_pickle(unmatched_path)
+        except (OSError, ValueError):
+            return None
+
+    def staging_directory(self, key, brand):
+        """Return a fresh directory to write a brand's corpus into."""
+        directory, _ = self._paths(key, brand)
+        staging = f"{directory}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        return staging
+
+    def store(self, key, brand, staging, unmatched_data):
+        """Move a corpus written to staging into place and return it."""
+        directory, unmatched_path = self._paths(key, brand)
+        unmatched_data.to_pickle(os.path.join(staging, "unmatched.pkl"))
+        # Renaming the whole directory means readers never see a partial
+        # corpus; one stored meanwhile by another training is replaced.
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+        return ShardedCorpus(directory)
+
+    def _paths(self, key, brand):
+        name = re.sub(r"[^\w.-]", "_", str(brand))
+        directory = os.path.join(self.root, key, name)
+        return directory, os.path.join(directory, "unmatched.pkl")
+
+    @staticmethod
+    def _write(path, write):
+        # Write next to the target and rename, so readers never see a
+        # partial file.
+        temporary = f"{path}.{os.getpid()}.tmp"
+        write(temporary)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def _dump_json(value, path):
+        with open(path, "w") as f:
+            json.dump(value, f)
+
+    def _prune(self, current):
+        entries = sorted(
+            (entry for entry in os.scandir(self.root) if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in entries[self.kept :]:
+            if entry.name != current:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+corpus_cache = CorpusCache() if CORPUS_CACHE_DIR else None
@@ -0,0 +1,42 @@
+import glob
+import os
+
+import pandas as pd
+
+DATA_ROOT = "component_warranty_model/Data"
+
+
+def brand_data_files(brand):
+    """Return the historical extraction workbooks kept for a brand."""
+    return sorted(glob.glob(os.path.join(DATA_ROOT, brand, "extracted_models_*.xlsx")))
+
+
+def load_descriptions(brand, limit=None):
+    """Collect the distinct model descriptions recorded for a brand."""
+    descriptions = []
+    for path in brand_data_files(brand):
+        for sheet in pd.read_excel(path, sheet_name=None).values():
+            if "Model Description" in sheet.columns:
+                descriptions.extend(sheet["Model Description"].dropna().astype(str))
+
+    descriptions = list(dict.fromkeys(descriptions))
+    return descriptions[:limit] if limit else descriptions
+
+
+def load_labelled_examples(brand, limit=None):
+    """Collect (Model Description, Model Code) pairs recorded for a brand."""
+    frames = []
+    for path in brand_data_files(brand):
+        for sheet in pd.read_excel(path, sheet_name=None).values():
+            if {"Model Description", "Model Code"}.issubset(sheet.columns):
+                frames.append(sheet[["Model Description", "Model Code"]])
+
+    if not frames:
+        return pd.DataFrame(columns=["Model Description", "Model Code"])
+    labelled = (
+        pd.concat(frames)
+        .dropna()
+        .astype(str)
+        .drop_duplicates(subset="Model Description")
+    )
+    return labelled.head(limit) if limit else labelled
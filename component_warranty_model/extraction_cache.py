@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "100000"))
+EXTRACTION_CACHE_TTL_SECONDS = float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", "3600"))
+
+# Optional on-disk cache shared by every worker process; unset disables it.
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "")
+EXTRACTION_CACHE_DB_MAX_ENTRIES = int(
+    os.getenv("EXTRACTION_CACHE_DB_MAX_ENTRIES", "1000000")
+)
+
+# A hit only rewrites an entry's last_used once it is this old, so repeated
+# reads stay read-only; eviction order is accurate to about this much.
+EXTRACTION_CACHE_DB_TOUCH_SECONDS = 600
+
+# The table is only counted for eviction after this many rows were written
+# by a process, so it can briefly exceed max_entries by that much per worker.
+EXTRACTION_CACHE_DB_EVICT_EVERY = 1000
+
+# SQLite limits the number of bound parameters per statement.
+SQLITE_CHUNK_SIZE = 500
+
+
+def normalize_description(text):
+    """Collapse whitespace so trivially different descriptions share a key."""
+    return " ".join(str(text).split())
+
+
+class ExtractionCache:
+    """In-memory LRU cache of MODEL entities with an optional TTL.
+
+    Keys are (brand, model fingerprint, normalized description); a retrained
+    model has a new fingerprint, so stale entries are never returned.
+    """
+
+    def __init__(
+        self,
+        max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+        ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached entities for a key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key, entities):
+        """Store the entities found for a key."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tuple(entities))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, brand):
+        """Drop every entry cached for a brand."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == brand]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return entry count and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SQLiteExtractionCache:
+    """On-disk extraction cache shared by worker processes and restarts.
+
+    The database runs in WAL mode so readers in one worker do not block a
+    writer in another. When it grows past max_entries, the least recently
+    used tenth of the entries is evicted; the size is only checked every
+    EXTRACTION_CACHE_DB_EVICT_EVERY writes.
+    """
+
+    def __init__(self, path, max_entries=EXTRACTION_CACHE_DB_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._unchecked_writes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " brand TEXT NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " description TEXT NOT NULL,"
+                " entities TEXT NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (brand, fingerprint, description))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+            )
+
+    def get_many(self, keys):
+        """Return {key: entities} for the keys found in the database."""
+        found = {}
+        stale = []
+        now = time.time()
+        for (brand, fingerprint), descriptions in _group_keys(keys).items():
+            for chunk in _chunks(descriptions):
+                rows = self._connection().execute(
+                    "SELECT description, entities, last_used FROM entries"
+                    " WHERE brand = ? AND fingerprint = ?"
+                    f" AND description IN ({', '.join('?' * len(chunk))})",
+                    [brand, fingerprint, *chunk],
+                )
+                for description, entities, last_used in rows:
+                    key = (brand, fingerprint, description)
+                    found[key] = json.loads(entities)
+                    if now - last_used > EXTRACTION_CACHE_DB_TOUCH_SECONDS:
+                        stale.append(key)
+
+        if stale:
+            with self._connection() as conn:
+                conn.executemany(
+                    "UPDATE entries SET last_used = ?"
+                    " WHERE brand = ? AND fingerprint = ? AND description = ?",
+                    [(now, *key) for key in stale],
+                )
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store (key, entities) pairs and evict old entries if over budget."""
+        now = time.time()
+        rows = [(*key, json.dumps(list(entities)), now) for key, entities in items]
+        with self._lock:
+            self._unchecked_writes += len(rows)
+            check = self._unchecked_writes >= EXTRACTION_CACHE_DB_EVICT_EVERY
+            if check:
+                self._unchecked_writes = 0
+
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if not check:
+                return
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE rowid IN ("
+                    " SELECT rowid FROM entries ORDER BY last_used LIMIT ?)",
+                    (count - int(self.max_entries * 0.9),),
+                )
+
+    def invalidate(self, brand):
+        """Drop every entry stored for a brand."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE brand = ?", (brand,))
+
+    def stats(self):
+        """Return entry count and this process's hit/miss counters."""
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _connection(self):
+        # sqlite3 connections must not cross threads or forked processes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+def _group_keys(keys):
+    grouped = {}
+    for brand, fingerprint, description in dict.fromkeys(keys):
+        grouped.setdefault((brand, fingerprint), []).append(description)
+    return grouped
+
+
+def _chunks(values):
+    for start in range(0, len(values), SQLITE_CHUNK_SIZE):
+        yield values[start : start + SQLITE_CHUNK_SIZE]
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from component_warranty_model.ingestion import count_rows, detect_format, read_chunks
+from component_warranty_model.training_jobs import JOB_ID_PATTERN, read_json, write_json
+
+# Bulk extraction jobs run on threads of the API process that accepted them
+# (inference itself goes through the inference backend) and spill their
+# results to EXTRACT_JOB_DIR as newline-delimited JSON, one directory per
+# job. Status, progress and checkpoints are kept in status.json next to the
+# results, so any server worker can answer status and results calls.
+EXTRACT_JOB_DIR = os.getenv(
+    "EXTRACT_JOB_DIR", os.path.join(tempfile.gettempdir(), "extraction_jobs")
+)
+EXTRACT_JOB_WORKERS = int(os.getenv("EXTRACT_JOB_WORKERS", "1"))
+EXTRACT_JOBS_KEPT = int(os.getenv("EXTRACT_JOBS_KEPT", "100"))
+
+# The byte offset of every EXTRACT_JOB_INDEX_EVERY-th result row is kept so
+# a page can be read without scanning the file from the start.
+EXTRACT_JOB_INDEX_EVERY = 1000
+EXTRACT_JOB_PAGE_MAX = 10000
+
+
+class ExtractionJobManager:
+    """Run bulk extractions in the background and page through their results."""
+
+    def __init__(self, max_workers=EXTRACT_JOB_WORKERS, job_dir=EXTRACT_JOB_DIR):
+        self.job_dir = job_dir
+        self._executor = ThreadPoolExecutor(max_workers, "extraction-job")
+
+    def submit(self, upload_path, content_type=None):
+        """Queue the extraction of a saved upload and return its job id."""
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(self.job_dir, job_id)
+        os.makedirs(directory)
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "rows_total": None,
+            "rows_done": 0,
+            "bytes_done": 0,
+            "checkpoints": [0],
+            "error": None,
+        }
+        write_json(os.path.join(directory, "status.json"), job)
+        self._prune()
+        self._executor.submit(self._run, job, upload_path, content_type)
+        return job_id
+
+    def status(self, job_id):
+        """Return a snapshot of a job's progress, or None if the id is unknown."""
+        job = self._read(job_id)
+        if job is None:
+            return None
+        snapshot = {
+            name: job[name]
+            for name in (
+                "job_id",
+                "status",
+                "submitted_at",
+                "started_at",
+                "finished_at",
+                "rows_total",
+                "rows_done",
+                "error",
+            )
+        }
+
+        if snapshot["started_at"]:
+            elapsed = (snapshot["finished_at"] or time.time()) - snapshot["started_at"]
+            snapshot["rows_per_second"] = round(
+                snapshot["rows_done"] / elapsed if elapsed else 0.0, 1
+            )
+        return snapshot
+
+    def results(self, job_id, offset=0, limit=1000):
+        """Return a page of result rows, or None if the id is unknown.
+
+        Rows already written can be read while the job is still running;
+        next_offset is None once the last row has been returned.
+        """
+        job = self._read(job_id)
+        if job is None:
+            return None
+        status, rows_done = job["status"], job["rows_done"]
+        checkpoints = job["checkpoints"]
+
+        offset = max(0, offset)
+        end = min(offset + max(0, min(limit, EXTRACT_JOB_PAGE_MAX)), rows_done)
+        rows = []
+        if offset < end:
+            index = min(offset // EXTRACT_JOB_INDEX_EVERY, len(checkpoints) - 1)
+            line = index * EXTRACT_JOB_INDEX_EVERY
+            with open(self._results_file(job_id), "rb") as f:
+                f.seek(checkpoints[index])
+                while line < end:
+                    record = f.readline()
+                    if line >= offset:
+                        rows.append(json.loads(record))
+                    line += 1
+
+        next_offset = offset + len(rows)
+        if status in ("completed", "failed") and next_offset >= rows_done:
+            next_offset = None
+        return {
+            "job_id": job_id,
+            "status": status,
+            "offset": offset,
+            "rows": rows,
+            "next_offset": next_offset,
+        }
+
+    def results_path(self, job_id):
+        """Return the NDJSON results file of a completed job, or None."""
+        job = self._read(job_id)
+        if job is None or job["status"] != "completed":
+            return None
+        return self._results_file(job_id)
+
+    def shutdown(self):
+        """Stop taking jobs; running ones are abandoned with the process."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, upload_path, content_type):
+        from component_warranty_model.main import (
+            check_extract_columns,
+            iter_processed_chunks,
+        )
+
+        self._update(job, status="running", started_at=time.time())
+        try:
+            results_file = self._results_file(job["job_id"])
+            with open(upload_path, "rb") as f, open(results_file, "wb") as out:
+                file_format = detect_format(f, content_type)
+                self._update(job, rows_total=count_rows(f, file_format))
+                chunks = check_extract_columns(read_chunks(f, file_format))
+                for group_df in iter_processed_chunks(chunks):
+                    self._write_rows(job, out, group_df)
+            self._update(job, status="completed", finished_at=time.time())
+        except Exception as e:
+            self._update(
+                job,
+                status="failed",
+                error=getattr(e, "detail", None) or str(e),
+                finished_at=time.time(),
+            )
+        finally:
+            os.remove(upload_path)
+
+    def _write_rows(self, job, out, group_df):
+        """Append rows to the results file and publish them once flushed."""
+        rows_done, position = job["rows_done"], job["bytes_done"]
+        checkpoints = []
+        for record in group_df.to_json(orient="records", lines=True).splitlines():
+            if rows_done and rows_done % EXTRACT_JOB_INDEX_EVERY == 0:
+                checkpoints.append(position)
+            line = record.encode() + b"\n"
+            out.write(line)
+            position += len(line)
+            rows_done += 1
+        out.flush()
+
+        self._update(
+            job,
+            checkpoints=job["checkpoints"] + checkpoints,
+            rows_done=rows_done,
+            bytes_done=position,
+        )
+
+    def _update(self, job, **fields):
+        # Only the thread running a job writes its status file.
+        job.update(fields)
+        write_json(os.path.join(self.job_dir, job["job_id"], "status.json"), job)
+
+    def _read(self, job_id):
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        try:
+            return read_json(os.path.join(self.job_dir, job_id, "status.json"))
+        except (OSError, ValueError):
+            return None
+
+    def _results_file(self, job_id):
+        return os.path.join(self.job_dir, job_id, "results.ndjson")
+
+    def _prune(self):
+        # Drop the oldest finished jobs of any server worker past the limit.
+        try:
+            entries = sorted(
+                (entry for entry in os.scandir(self.job_dir) if entry.is_dir()),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+        except OSError:
+            return
+        for entry in entries[: max(0, len(entries) - EXTRACT_JOBS_KEPT)]:
+            job = self._read(entry.name)
+            if job is not None and job["status"] in ("completed", "failed"):
+                shutil.rmtree(entry.path, ignore_errors=True)
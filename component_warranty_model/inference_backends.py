@@ -0,0 +1,239 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from component_warranty_model.micro_batcher import MicroBatcher
+from component_warranty_model.model_registry import available_brands, model_registry
+from component_warranty_model.worker_pool import create_process_pool
+
+# Bulk extraction settings for nlp.pipe
+EXTRACT_BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "256"))
+EXTRACT_N_PROCESS = int(os.getenv("EXTRACT_N_PROCESS", "1"))
+
+# "local" runs NER on threads of the serving process; "process" sends it to a
+# pool of long-lived worker processes, each holding its own model registry;
+# "sharded" gives every brand to one worker so each only loads its shard.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "local")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+
+# Optional fixed brand placement for the sharded backend, e.g.
+# "Samsung=0,LG=1"; brands not listed are placed by consistent hashing.
+INFERENCE_SHARD_MAP = os.getenv("INFERENCE_SHARD_MAP", "")
+
+
+def extract_entities(
+    nlp, texts, batch_size=EXTRACT_BATCH_SIZE, n_process=EXTRACT_N_PROCESS
+):
+    """Stream texts through the pipeline and collect MODEL entities per text."""
+    return [
+        [ent.text for ent in doc.ents if ent.label_ == "MODEL"]
+        for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    ]
+
+
+def extract_in_process(brand, texts):
+    """Run NER on a batch using this process's model registry."""
+    return extract_entities(model_registry.get(brand), texts, n_process=1)
+
+
+def warm_up_in_process(brands):
+    """Load each brand and run one inference through it."""
+    for brand in brands:
+        try:
+            extract_in_process(brand, ["warm up"])
+            print(f"Model warmed up for {brand}!")
+        except Exception as e:
+            print(f"Failed to warm up model for brand '{brand}': {str(e)}")
+
+
+def warm_up_worker(brands, ready):
+    """Worker initializer: warm up the brands, then release the ready semaphore."""
+    warm_up_in_process(brands)
+    ready.release()
+
+
+class LocalInferenceBackend:
+    """Run inference on threads of the serving process.
+
+    Both backends return concurrent.futures.Future objects: synchronous
+    callers wait on .result(), async handlers await asyncio.wrap_future().
+    Single descriptions are coalesced into batches by a MicroBatcher.
+    """
+
+    def __init__(self, max_workers=INFERENCE_WORKERS):
+        self.batcher = MicroBatcher(self.submit_batch, max_in_flight=max_workers)
+        self._executor = ThreadPoolExecutor(max_workers, "inference")
+
+    def submit_batch(self, brand, texts):
+        """Schedule one micro-batch of descriptions for a brand."""
+        return self._executor.submit(extract_in_process, brand, list(texts))
+
+    def submit(self, brand, texts):
+        """Schedule a batch of descriptions; the future yields one list per text."""
+        return self._executor.submit(
+            lambda: extract_entities(model_registry.get(brand), texts)
+        )
+
+    def submit_one(self, brand, text):
+        """Schedule a single description to be batched with concurrent ones."""
+        return self.batcher.submit(brand, text)
+
+    def warm_up(self, brands):
+        warm_up_in_process(brands)
+
+    def loaded_brands(self):
+        return model_registry.loaded_brands()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class ProcessPoolInferenceBackend(LocalInferenceBackend):
+    """Run inference in a pool of long-lived worker processes.
+
+    Every worker keeps its own model registry and preloads warm_up_brands
+    when it starts, so CPU-bound NER uses every core without a full
+    FastAPI worker per core. Up to one micro-batch per worker runs at once
+    for a brand.
+    """
+
+    def __init__(self, max_workers=INFERENCE_WORKERS, warm_up_brands=()):
+        self.max_workers = max(1, max_workers)
+        self.batcher = MicroBatcher(self.submit, max_in_flight=self.max_workers)
+        self.warm_up_brands = list(warm_up_brands)
+        self._ready = multiprocessing.get_context("spawn").Semaphore(0)
+        self._closed = False
+        self._pool = create_process_pool(
+            self.max_workers,
+            setup="component_warranty_model.inference_backends:warm_up_worker",
+            setup_args=(self.warm_up_brands, self._ready),
+        )
+
+    def submit(self, brand, texts):
+        return self._pool.submit(extract_in_process, brand, list(texts))
+
+    def warm_up(self, brands):
+        # The pool starts a worker per submitted task until it is full, and
+        # each worker reports once its initializer has loaded every brand;
+        # wait for all of them, not just for the first one to take tasks.
+        started = [self._pool.submit(os.getpid) for _ in range(self.max_workers)]
+        for _ in range(self.max_workers):
+            while not self._ready.acquire(timeout=1):
+                # A worker that died while loading never reports; give up
+                # once the pool is broken or shut down.
+                for future in started:
+                    if future.done():
+                        future.result()
+                if self._closed:
+                    return
+
+    def loaded_brands(self):
+        return self.warm_up_brands
+
+    def shutdown(self):
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ConsistentHashRing:
+    """Map keys to nodes so that adding a node only moves ~1/n of the keys."""
+
+    def __init__(self, nodes, replicas=64):
+        self._ring = sorted(
+            (self._hash(f"{node}:{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in self._ring]
+
+    def node_for(self, key):
+        """Return the node owning a key."""
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class ShardedInferenceBackend(LocalInferenceBackend):
+    """Route each brand to the single worker process that owns it.
+
+    Every shard is a one-process pool that only ever loads the brands
+    assigned to it, so memory per process is bounded by its shard rather
+    than the whole catalog. There are never more shards than brands, and
+    a shard's process only starts once it is given work, so shards that
+    own no warm-up brand cost nothing until one of their brands is used.
+    """
+
+    def __init__(
+        self, shards=INFERENCE_WORKERS, warm_up_brands=(), shard_map=INFERENCE_SHARD_MAP
+    ):
+        shards = max(1, min(shards, len(available_brands())))
+        self.batcher = MicroBatcher(self.submit)
+        self.ring = ConsistentHashRing(range(shards))
+        self.fixed_shards = {
+            brand.strip(): int(shard) % shards
+            for brand, shard in (
+                item.split("=") for item in shard_map.split(",") if "=" in item
+            )
+        }
+        self.warm_up_brands = list(warm_up_brands)
+        self._pools = [
+            create_process_pool(
+                1,
+                setup="component_warranty_model.inference_backends:warm_up_in_process",
+                setup_args=(self.brands_for_shard(shard, self.warm_up_brands),),
+            )
+            for shard in range(shards)
+        ]
+
+    def shard_for(self, brand):
+        """Return the index of the worker that owns a brand."""
+        if brand in self.fixed_shards:
+            return self.fixed_shards[brand]
+        return self.ring.node_for(brand)
+
+    def brands_for_shard(self, shard, brands):
+        return [brand for brand in brands if self.shard_for(brand) == shard]
+
+    def submit(self, brand, texts):
+        return self._pools[self.shard_for(brand)].submit(
+            extract_in_process, brand, list(texts)
+        )
+
+    def warm_up(self, brands):
+        # Only shards owning a warm-up brand are started here.
+        for future in [
+            pool.submit(os.getpid)
+            for shard, pool in enumerate(self._pools)
+            if self.brands_for_shard(shard, self.warm_up_brands)
+        ]:
+            future.result()
+
+    def loaded_brands(self):
+        return self.warm_up_brands
+
+    def shard_assignments(self):
+        """Return the warm-up brands owned by each shard."""
+        return {
+            shard: self.brands_for_shard(shard, self.warm_up_brands)
+            for shard in range(len(self._pools))
+        }
+
+    def shutdown(self):
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_inference_backend(kind=INFERENCE_BACKEND, warm_up_brands=()):
+    """Build the inference backend selected by INFERENCE_BACKEND."""
+    if kind == "local":
+        return LocalInferenceBackend()
+    if kind == "process":
+        return ProcessPoolInferenceBackend(warm_up_brands=warm_up_brands)
+    if kind == "sharded":
+        return ShardedInferenceBackend(warm_up_brands=warm_up_brands)
+    raise ValueError(f"Unknown inference backend '{kind}'.")
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+# Uploaded files are read in chunks of INGEST_CHUNK_ROWS rows, so memory is
+# bounded by the chunk size rather than by the size of the upload.
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "1000"))
+COPY_BLOCK_BYTES = 1024 * 1024
+
+CONTENT_TYPE_FORMATS = {
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/parquet": "parquet",
+}
+
+OUTPUT_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def spool_body(body):
+    """Copy an upload body into a temporary file on disk, block by block.
+
+    A real file rather than a SpooledTemporaryFile: on Python 3.9 the latter
+    has no seekable(), which openpyxl's zip reader needs for xlsx uploads.
+    """
+    spooled = tempfile.TemporaryFile()
+    shutil.copyfileobj(body, spooled, COPY_BLOCK_BYTES)
+    spooled.seek(0)
+    return spooled
+
+
+def file_digest(f):
+    """Return the sha256 of a seekable file's content, leaving it in place."""
+    position = f.tell()
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(COPY_BLOCK_BYTES), b""):
+        digest.update(block)
+    f.seek(position)
+    return digest.hexdigest()
+
+
+def save_body(body, directory=None):
+    """Copy an upload body to a named temporary file and return its path."""
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        shutil.copyfileobj(body, f, COPY_BLOCK_BYTES)
+    return f.name
+
+
+def detect_format(f, content_type=None):
+    """Work out whether a seekable upload is xlsx, parquet or csv.
+
+    A specific content type wins; otherwise the first bytes are checked for
+    the zip (xlsx) or PAR1 (parquet) signatures, and anything else is read
+    as CSV.
+    """
+    if content_type:
+        file_format = CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip())
+        if file_format:
+            return file_format
+
+    position = f.tell()
+    magic = f.read(4)
+    f.seek(position)
+    if magic == b"PK\x03\x04":
+        return "xlsx"
+    if magic == b"PAR1":
+        return "parquet"
+    return "csv"
+
+
+def iter_excel_chunks(f, chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield the first sheet of a workbook as DataFrames of chunk_rows rows.
+
+    The workbook is opened in openpyxl's read-only mode, which streams rows
+    from the file instead of building the whole sheet in memory. Blank rows
+    are skipped and unnamed columns are named like pandas does.
+    """
+    workbook = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = [
+            name if name is not None else f"Unnamed: {i}"
+            for i, name in enumerate(header)
+        ]
+        width = len(columns)
+        batch, start = [], 0
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append((tuple(row) + (None,) * width)[:width])
+            if len(batch) >= chunk_rows:
+                yield excel_chunk(batch, columns, start)
+                start += len(batch)
+                batch = []
+
+        # A sheet with a header and no rows still yields one empty chunk,
+        # so callers can check its columns.
+        if batch or not start:
+            yield excel_chunk(batch, columns, start)
+    finally:
+        workbook.close()
+
+
+def excel_chunk(rows, columns, start):
+    return pd.DataFrame(
+        rows, columns=columns, index=pd.RangeIndex(start, start + len(rows))
+    )
+
+
+def iter_csv_chunks(f, chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield a CSV file as DataFrames of chunk_rows rows."""
+    with pd.read_csv(f, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def iter_parquet_chunks(f, chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield a Parquet file as DataFrames of at most chunk_rows rows."""
+    parquet_file = pq.ParquetFile(f)
+    start = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        chunk_df = batch.to_pandas()
+        chunk_df.index = pd.RangeIndex(start, start + len(chunk_df))
+        start += len(chunk_df)
+        yield chunk_df
+
+
+CHUNK_READERS = {
+    "xlsx": iter_excel_chunks,
+    "csv": iter_csv_chunks,
+    "parquet": iter_parquet_chunks,
+}
+
+
+def read_chunks(f, file_format="xlsx", chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield a seekable file of the given format as DataFrame chunks."""
+    if file_format not in CHUNK_READERS:
+        raise ValueError(f"Unsupported input format '{file_format}'.")
+    return CHUNK_READERS[file_format](f, chunk_rows)
+
+
+def iter_upload_chunks(s3_obj, file_format=None, chunk_rows=INGEST_CHUNK_ROWS):
+    """Spool an uploaded S3 object and yield its rows as DataFrame chunks.
+
+    Without an explicit file_format, the format is detected from the
+    object's ContentType and its first bytes.
+    """
+    with spool_body(s3_obj["Body"]) as f:
+        file_format = file_format or detect_format(f, s3_obj.get("ContentType"))
+        yield from read_chunks(f, file_format, chunk_rows)
+
+
+def count_rows(f, file_format):
+    """Return the number of data rows when the file records it, else None."""
+    position = f.tell()
+    try:
+        if file_format == "parquet":
+            return pq.ParquetFile(f).metadata.num_rows
+        if file_format == "xlsx":
+            workbook = load_workbook(f, read_only=True)
+            try:
+                max_row = workbook.worksheets[0].max_row
+            finally:
+                workbook.close()
+            return max(0, max_row - 1) if max_row else None
+        return None
+    finally:
+        f.seek(position)
+
+
+def arrow_table(df):
+    """Convert a DataFrame to an Arrow table.
+
+    Columns Arrow cannot type, such as workbook columns mixing numbers and
+    text, are written as strings; missing values stay null.
+    """
+    columns = {}
+    for name in df.columns:
+        try:
+            columns[str(name)] = pa.array(df[name], from_pandas=True)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            as_text = df[name].astype(str).where(df[name].notna(), None)
+            columns[str(name)] = pa.array(as_text, from_pandas=True)
+    return pa.table(columns)
+
+
+def write_dataframe(df, file_format):
+    """Serialize a DataFrame to Parquet or Arrow IPC file bytes."""
+    table = arrow_table(df)
+    sink = pa.BufferOutputStream()
+    if file_format == "parquet":
+        pq.write_table(table, sink)
+    elif file_format == "arrow":
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unsupported output format '{file_format}'.")
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pandas as pd
+
+from component_warranty_model.benchmark import percentile
+from component_warranty_model.data_files import (
+    load_descriptions,
+    load_labelled_examples,
+)
+from component_warranty_model.model_registry import available_brands
+
+# Drive /extract (device_details and s3_obj) and /train at a fixed
+# concurrency and arrival rate and report throughput, latency percentiles
+# and error rates per endpoint.
+#
+# By default the app is loaded in this process and device_details requests
+# go through its ASGI interface, so validation, routing and serialization
+# are measured. An S3 body cannot travel over HTTP, so s3_obj and /train
+# requests call the handlers directly, with S3 objects replaced by local
+# files (the same {"Body": ...} shape main.py gets from S3). A /train
+# request's latency runs until its job has finished, polled through
+# /train/{job_id}; jobs still queued when the run ends are cancelled. With
+# --url only device_details requests can be sent. /train requests overwrite
+# the brand's fine_tune_model and unmatched cases, so they need
+# --allow-training.
+#
+#   python -m component_warranty_model.load_test --brands Sony,Panasonic \
+#       --mix device=90,s3=10 --concurrency 32 --rate 200 --requests 2000
+#   python -m component_warranty_model.load_test --url http://localhost:8000
+
+ENDPOINTS = ("device", "s3", "train")
+ERROR_SAMPLES_KEPT = 5
+TRAIN_POLL_SECONDS = 1
+TRAIN_FINISHED = ("completed", "completed_with_errors", "failed", "cancelled")
+
+CONTENT_TYPES = {
+    ".csv": "text/csv",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".parquet": "application/vnd.apache.parquet",
+}
+
+
+class LocalFileBody:
+    """Stand-in for a boto3 StreamingBody that reads a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def read(self, amt=None):
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        data = self._file.read() if amt is None else self._file.read(amt)
+        if not data:
+            self.close()
+        return data
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def local_s3_object(path):
+    """Return a get_object-style response whose Body serves a local file."""
+    return {
+        "Body": LocalFileBody(path),
+        "ContentLength": os.path.getsize(path),
+        "ContentType": CONTENT_TYPES.get(
+            os.path.splitext(path)[1], "binary/octet-stream"
+        ),
+    }
+
+
+def write_extract_file(brands, rows, directory):
+    """Write a CSV of historical descriptions in the layout /extract expects."""
+    records = []
+    for brand in brands:
+        records += [(brand, text) for text in load_descriptions(brand)]
+    random.shuffle(records)
+    records = (records * (rows // max(1, len(records)) + 1))[:rows]
+
+    df = pd.DataFrame(records, columns=["BRAND", "Model Description"])
+    df.insert(1, "Brand", df["BRAND"])
+    path = os.path.join(directory, "extract.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+def write_train_file(brand, rows, directory):
+    """Write a CSV of labelled descriptions in the layout /train expects."""
+    df = load_labelled_examples(brand, rows)
+    df.insert(0, "Brand", brand)
+    path = os.path.join(directory, "train.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+class EndpointStats:
+    """Latencies and errors collected for one endpoint."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.error_samples = []
+
+    def record(self, seconds, error=None):
+        self.latencies.append(seconds * 1000)
+        if error is not None:
+            self.errors += 1
+            if len(self.error_samples) < ERROR_SAMPLES_KEPT:
+                self.error_samples.append(error)
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"requests": 0}
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "error_rate": round(self.errors / len(latencies), 4),
+            "throughput_per_second": round((len(latencies) - self.errors) / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "error_samples": self.error_samples,
+        }
+
+
+class HTTPClient:
+    """Send device_details requests to the app over HTTP.
+
+    With a transport, requests go to that transport instead of the network.
+    """
+
+    def __init__(self, url, transport=None):
+        self.client = httpx.AsyncClient(base_url=url, transport=transport, timeout=60)
+
+    async def device(self, brand, text):
+        response = await self.client.request(
+            "GET",
+            "/extract",
+            json={"device_details": {"brand": brand, "model": text}},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def wait_ready(self):
+        while True:
+            try:
+                response = await self.client.get("/ready", timeout=5)
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class InProcessClient(HTTPClient):
+    """Send requests to the app loaded in this process.
+
+    device_details requests go through the app's ASGI interface; s3_obj and
+    /train requests call the handlers directly with local files as bodies.
+    """
+
+    def __init__(self, extract_file, train_file, train_brand):
+        from component_warranty_model import main
+
+        super().__init__("http://in-process", httpx.ASGITransport(app=main.app))
+        self.main = main
+        self.extract_file = extract_file
+        self.train_file = train_file
+        self.train_brand = train_brand
+
+    async def s3(self, brand, text):
+        request = self.main.ExtractModelRequest(
+            s3_obj=local_s3_object(self.extract_file)
+        )
+        return await self.main.extract_model_codes(request)
+
+    async def train(self, brand, text):
+        request = self.main.TrainRequest(
+            s3_obj=local_s3_object(self.train_file), brand=self.train_brand
+        )
+        job_id = (await self.main.train_endpoint(request))["job_id"]
+        while True:
+            response = await self.client.get(f"/train/{job_id}")
+            response.raise_for_status()
+            job = response.json()
+            if job["status"] in TRAIN_FINISHED:
+                break
+            await asyncio.sleep(TRAIN_POLL_SECONDS)
+        if job["status"] != "completed":
+            error = job.get("error") or job.get("summary", {}).get("failed")
+            raise RuntimeError(f"Training job {job['status']}: {error}")
+        return job
+
+
+async def run_load(client, mix, descriptions, concurrency, rate, requests, duration):
+    """Issue requests until the request count or duration is reached.
+
+    With rate > 0 requests arrive at that many per second (open loop) and
+    queue while all concurrency slots are busy; with rate 0 every slot
+    sends its next request as soon as the previous one finishes.
+    """
+    stats = {endpoint: EndpointStats() for endpoint in mix}
+    endpoints = list(mix)
+    weights = [mix[endpoint] for endpoint in endpoints]
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def one_request(endpoint, start):
+        brand, text = random.choice(descriptions)
+        error = None
+        try:
+            await getattr(client, endpoint)(brand, text)
+        except Exception as e:
+            error = f"{type(e).__name__}: {getattr(e, 'detail', None) or e}"
+        finally:
+            slots.release()
+        stats[endpoint].record(time.perf_counter() - start, error)
+
+    started = time.perf_counter()
+    sent = 0
+    while sent < requests and time.perf_counter() - started < duration:
+        # In open loop a request's latency counts from when it was due, so
+        # time spent waiting for a free slot is not hidden.
+        if rate:
+            due = started + sent / rate
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await slots.acquire()
+        if not rate:
+            due = time.perf_counter()
+        task = asyncio.create_task(
+            one_request(random.choices(endpoints, weights)[0], due)
+        )
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        sent += 1
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_sent": sent,
+        "endpoints": {
+            endpoint: endpoint_stats.summary(elapsed)
+            for endpoint, endpoint_stats in stats.items()
+        },
+    }
+
+
+async def main_async(args):
+    brands = [
+        brand.strip() for brand in args.brands.split(",") if brand.strip()
+    ] or available_brands()
+    mix = {
+        name.strip(): float(weight)
+        for name, weight in (item.split("=") for item in args.mix.split(","))
+        if float(weight) > 0
+    }
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    if args.url and set(mix) - {"device"}:
+        raise SystemExit("Only the device endpoint can be load tested over --url.")
+    if "train" in mix and not args.allow_training:
+        raise SystemExit(
+            "/train requests overwrite the brand's fine_tune_model and unmatched "
+            "cases; pass --allow-training to include them."
+        )
+
+    descriptions = [
+        (brand, text)
+        for brand in brands
+        for text in load_descriptions(brand, args.descriptions_per_brand)
+    ]
+    if not descriptions:
+        raise SystemExit("No descriptions found for the selected brands.")
+
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max(args.concurrency, 4))
+    )
+    options = (args.concurrency, args.rate, args.requests, args.duration)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            client = HTTPClient(args.url)
+            try:
+                await client.wait_ready()
+                return await run_load(client, mix, descriptions, *options)
+            finally:
+                await client.close()
+
+        extract_file = args.s3_file
+        if "s3" in mix and not extract_file:
+            extract_file = write_extract_file(brands, args.s3_rows, directory)
+        train_file = args.train_file
+        if "train" in mix and not train_file:
+            train_file = write_train_file(brands[0], args.train_rows, directory)
+
+        client = InProcessClient(extract_file, train_file, brands[0])
+        app = client.main.app
+        async with app.router.lifespan_context(app):
+            try:
+                await client.wait_ready()
+                return await run_load(client, mix, descriptions, *options)
+            finally:
+                await client.close()
+                # Leaving the lifespan would otherwise run every queued job.
+                await asyncio.to_thread(
+                    client.main.training_jobs.shutdown, cancel_pending=True
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m component_warranty_model.load_test",
+        description="Load test the extraction service.",
+    )
+    parser.add_argument("--url", help="running server to test (default: in-process)")
+    parser.add_argument("--brands", default="", help="comma-separated (default: all)")
+    parser.add_argument("--mix", default="device=100", help="e.g. device=90,s3=10")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0, help="0 means closed loop")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=300, help="maximum seconds")
+    parser.add_argument("--descriptions-per-brand", type=int, default=1000)
+    parser.add_argument("--s3-file", help="file served as the s3_obj body")
+    parser.add_argument("--s3-rows", type=int, default=1000)
+    parser.add_argument("--train-file", help="file served as the /train body")
+    parser.add_argument("--train-rows", type=int, default=200)
+    parser.add_argument(
+        "--allow-training",
+        action="store_true",
+        help="allow /train requests, which overwrite the brand's model",
+    )
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    report.update(
+        target=args.url or "in-process",
+        mix=args.mix,
+        concurrency=args.concurrency,
+        rate=args.rate,
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -1,15 +1,99 @@
+import asyncio
+import itertools
+import json
 import spacy
-import random
 import pandas as pd
-import re
 import uvicorn
-import io
-from spacy.training import Example, offsets_to_biluo_tags
-from spacy.tokenizer import Tokenizer
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
-
-app = FastAPI()
+from component_warranty_model.corpus_cache import corpus_cache
+from component_warranty_model.extraction_cache import (
+    EXTRACTION_CACHE_DB,
+    ExtractionCache,
+    SQLiteExtractionCache,
+    normalize_description,
+)
+from component_warranty_model.extraction_jobs import ExtractionJobManager
+from component_warranty_model.inference_backends import create_inference_backend
+from component_warranty_model.ingestion import (
+    OUTPUT_MEDIA_TYPES,
+    detect_format,
+    file_digest,
+    iter_upload_chunks,
+    read_chunks,
+    save_body,
+    spool_body,
+    write_dataframe,
+)
+from component_warranty_model.model_registry import (
+    available_brands,
+    cached_fingerprint,
+    install_model,
+    lock_brand_training,
+    model_fingerprint,
+    model_path,
+    model_registry,
+    staging_model_path,
+)
+from component_warranty_model.training_corpus import (
+    TRAIN_PREP_WORKERS,
+    configure_tokenizer,
+    write_corpus,
+)
+from component_warranty_model.training_jobs import TrainingJobManager
+from component_warranty_model.worker_pool import (
+    TRAIN_BRAND_WORKERS,
+    create_training_pool,
+)
+
+# Comma-separated brands to preload at startup; empty means every brand
+# with a fine_tune_model directory.
+WARMUP_BRANDS = os.getenv("WARMUP_BRANDS", "")
+
+# Training is scored on its dev split every TRAIN_EVAL_STEPS updates and
+# stops once TRAIN_PATIENCE scores in a row bring no improvement.
+TRAIN_EVAL_STEPS = int(os.getenv("TRAIN_EVAL_STEPS", "100"))
+TRAIN_PATIENCE = int(os.getenv("TRAIN_PATIENCE", "5"))
+
+# Parts of a pipeline left out of the best-weights checkpoint; they do not
+# change during training.
+CHECKPOINT_EXCLUDE = ["tokenizer", "vocab"]
+
+# Columns of an uploaded training sheet that training reads.
+TRAINING_COLUMNS = ["Model Description", "Model Code"]
+
+
+def warm_up_brands():
+    """Return the brands to preload at startup."""
+    return [
+        brand.strip() for brand in WARMUP_BRANDS.split(",") if brand.strip()
+    ] or available_brands()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Warm up brand models in the background; /ready reports when done."""
+    app.state.ready = False
+
+    async def warm_up():
+        await asyncio.to_thread(inference_backend.warm_up, warm_up_brands())
+        app.state.ready = True
+
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    training_jobs.shutdown()
+    extraction_jobs.shutdown()
+    inference_backend.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # Models for Request Validation
@@ -17,101 +101,363 @@ class TrainRequest(BaseModel):
     s3_obj: dict
     brand: str
     training_type: str = "resume"
+    export_profile: str = "full"
+    ner_width: int = 96
 
 
 class ExtractModelRequest(BaseModel):
     device_details: dict = {}
     s3_obj: dict = {}
+    stream: bool = False
+    output_format: str = "json"
 
 
-# Utility Functions
-def configure_tokenizer(nlp):
-    """Configure custom tokenizer for special characters."""
-    nlp.tokenizer = Tokenizer(
-        nlp.vocab, infix_finditer=re.compile(r"[.\-/():#|+]").finditer
-    )
+class ExtractJobRequest(BaseModel):
+    s3_obj: dict
 
 
-def extract_model_spans(text, extracted_model):
-    """Extract model spans using regex."""
-    if not isinstance(text, str) or not isinstance(extracted_model, str):
-        return []
-    pattern = (
-        re.escape(extracted_model).replace(r"\-", r"[-\s]*").replace(r"\.", r"[.\s]*")
+# Utility Functions
+def create_ner_only_pipeline(width=96):
+    """Create a blank pipeline with a single compact NER component."""
+    nlp = spacy.blank("en")
+    nlp.add_pipe(
+        "ner",
+        config={
+            "model": {
+                "@architectures": "spacy.TransitionBasedParser.v2",
+                "state_type": "ner",
+                "extra_state_tokens": False,
+                "hidden_width": 64,
+                "maxout_pieces": 2,
+                "use_upper": True,
+                "nO": None,
+                "tok2vec": {
+                    "@architectures": "spacy.HashEmbedCNN.v2",
+                    "pretrained_vectors": None,
+                    "width": width,
+                    "depth": 4,
+                    "embed_size": 2000,
+                    "window_size": 1,
+                    "maxout_pieces": 3,
+                    "subword_features": True,
+                },
+            }
+        },
     )
-    pattern = re.sub(r"([#\|+()])", r"[\1\s]*", pattern)
-    match = re.search(pattern, text, re.IGNORECASE)
-    return [(match.start(), match.end(), "MODEL")] if match else []
-
-
-def prepare_training_data(nlp, df):
-    """Prepare spaCy-compatible training data."""
-    training_data, unmatched_data = [], []
-
-    for _, row in df.iterrows():
-        text, extracted_model = row["Model Description"], row["Model Code"]
-        entities = extract_model_spans(text, extracted_model)
-
-        if entities:
-            doc = nlp.make_doc(text)
-            training_data.append(Example.from_dict(doc, {"entities": entities}))
+    return nlp
+
+
+def strip_to_ner(nlp):
+    """Remove every component except NER before saving."""
+    for name in [name for name in nlp.component_names if name != "ner"]:
+        nlp.remove_pipe(name)
+
+
+def train_ner_model(
+    s3_obj,
+    training_type="resume",
+    export_profile="full",
+    ner_width=96,
+    progress_callback=None,
+    max_workers=TRAIN_BRAND_WORKERS,
+):
+    """Train spaCy NER models for each brand.
+
+    Brands are trained concurrently in a pool of max_workers processes; a
+    failing brand does not affect the others. Returns a summary with the
+    result of every completed and failed brand.
+
+    When every brand of the upload is in the corpus cache, the file is not
+    parsed at all and each brand trains on its cached corpus.
+    """
+    started = time.perf_counter()
+    with spool_body(s3_obj["Body"]) as f:
+        cache_key = corpus_cache.key(file_digest(f)) if corpus_cache else None
+        cached_brands = corpus_cache.brands(cache_key) if corpus_cache else None
+        if cached_brands is not None:
+            grouped_by_brand = [(brand, None) for brand in cached_brands]
         else:
-            unmatched_data.append({"text": text, "extracted_model": extracted_model})
-
-    return training_data, unmatched_data
-
+            file_format = detect_format(f, s3_obj.get("ContentType"))
+            grouped_by_brand = group_training_rows(read_chunks(f, file_format))
+            if corpus_cache:
+                corpus_cache.record_brands(
+                    cache_key, [brand for brand, _ in grouped_by_brand]
+                )
 
-def train_ner_model(s3_obj, training_type="resume"):
-    """Train spaCy NER models for each brand."""
-    training_data_df = pd.read_excel(io.BytesIO(s3_obj["Body"].read()))
+    options = (training_type, export_profile, ner_width, progress_callback)
+    results = {}
 
-    grouped_by_brand = training_data_df.groupby("Brand")
+    if max_workers <= 1 or len(grouped_by_brand) <= 1:
+        for brand, brand_data in grouped_by_brand:
+            results[brand] = train_brand_model(
+                brand, brand_data, *options, TRAIN_PREP_WORKERS, cache_key
+            )
+    else:
+        brand_workers = min(max_workers, len(grouped_by_brand))
+        # Brands training side by side share the data preparation workers.
+        prep_workers = max(1, TRAIN_PREP_WORKERS // brand_workers)
+        with create_training_pool(brand_workers) as pool:
+            futures = {
+                brand: pool.submit(
+                    train_brand_model,
+                    brand,
+                    brand_data,
+                    *options,
+                    prep_workers,
+                    cache_key,
+                )
+                for brand, brand_data in grouped_by_brand
+            }
+            for brand, future in futures.items():
+                try:
+                    results[brand] = future.result()
+                except Exception as e:
+                    # The worker process itself died; nothing was reported.
+                    results[brand] = {"status": "failed", "error": str(e)}
+
+        # Models were written by other processes; drop what this one holds.
+        for brand in results:
+            model_registry.evict(brand)
+            extraction_cache.invalidate(brand)
+
+    return {
+        "completed": {b: r for b, r in results.items() if r["status"] == "completed"},
+        "failed": {b: r for b, r in results.items() if r["status"] == "failed"},
+        "elapsed_seconds": round(time.perf_counter() - started, 1),
+        "corpus_cache": {
+            "key": cache_key,
+            "hits": [b for b, r in results.items() if r.get("corpus") == "hit"],
+            "misses": [b for b, r in results.items() if r.get("corpus") == "miss"],
+        },
+    }
+
+
+def group_training_rows(chunks):
+    """Collect the training columns of each brand's rows from input chunks.
+
+    Only the columns training reads are kept, so the whole sheet is never
+    held in memory at once. Each brand's rows still are, since they are
+    all aligned and trained on together.
+    """
+    rows_by_brand = {}
+    for chunk_df in chunks:
+        for brand, group_df in chunk_df.groupby("Brand"):
+            rows_by_brand.setdefault(brand, []).append(group_df[TRAINING_COLUMNS])
+    return [
+        (brand, pd.concat(frames, ignore_index=True))
+        for brand, frames in sorted(rows_by_brand.items())
+    ]
+
+
+def train_brand_model(
+    brand,
+    brand_data,
+    training_type="resume",
+    export_profile="full",
+    ner_width=96,
+    progress_callback=None,
+    prep_workers=TRAIN_PREP_WORKERS,
+    cache_key=None,
+):
+    """Train and save the NER model of a single brand.
+
+    With export_profile="ner_only" the saved model holds only the NER
+    component; fresh trainings then start from a blank NER-only pipeline
+    of the given width instead of en_core_web_sm. The model being replaced
+    is kept in previous_model_path(brand) for comparison.
+
+    progress_callback(brand, **status) is called as the brand starts, after
+    every epoch and dev evaluation and when it finishes. Training data for
+    large sheets is prepared in up to prep_workers processes. The aligned
+    corpus is written to disk and streamed back in shuffled minibatches
+    every epoch, so the Examples are never all in memory. With a cache_key,
+    it is read from the corpus cache when present and stored there
+    otherwise; brand_data is None when the caller only has the cached
+    corpus.
+    """
+    report = progress_callback or (lambda brand, **status: None)
+    corpus_directory = lock_file = staging = None
+    try:
+        # Another process may be training this brand; wait for it to finish
+        # so the two never write the same model directory.
+        report(brand, status="waiting")
+        lock_file = lock_brand_training(brand)
+        report(brand, status="preparing")
+        if training_type == "resume":
+            nlp = spacy.load(model_path(brand))
+        elif export_profile == "ner_only":
+            nlp = create_ner_only_pipeline(ner_width)
+        else:
+            nlp = spacy.load("en_core_web_sm")
+        configure_tokenizer(nlp)
+        ner = (
+            nlp.create_pipe("ner")
+            if "ner" not in nlp.pipe_names
+            else nlp.get_pipe("ner")
+        )
+        ner.add_label("MODEL")
 
-    for brand, brand_data in grouped_by_brand:
-        try:
-            model_path = f"component_warranty_model/spaCy/{brand}/fine_tune_model"
-            nlp = (
-                spacy.load("en_core_web_sm")
-                if training_type != "resume"
-                else spacy.load(model_path)
+        cached = corpus_cache.load(cache_key, brand) if cache_key else None
+        if cached is not None:
+            corpus, unmatched_data = cached
+        elif brand_data is None:
+            raise ValueError("The cached training corpus is no longer available.")
+        else:
+            corpus_directory = (
+                corpus_cache.staging_directory(cache_key, brand)
+                if cache_key
+                else tempfile.mkdtemp(prefix="ner_corpus_")
             )
-            configure_tokenizer(nlp)
-            ner = (
-                nlp.create_pipe("ner")
-                if "ner" not in nlp.pipe_names
-                else nlp.get_pipe("ner")
+            corpus, unmatched_data = write_corpus(
+                nlp, brand_data, corpus_directory, prep_workers, dev_split=True
             )
-            ner.add_label("MODEL")
-
-            training_data, unmatched_data = prepare_training_data(nlp, brand_data)
+            if cache_key:
+                corpus = corpus_cache.store(
+                    cache_key, brand, corpus_directory, unmatched_data
+                )
+                corpus_directory = None
 
-            pd.DataFrame(unmatched_data).to_excel(
-                f"component_warranty_model/Data/{brand}/unmatched_cases.xlsx",
-                index=False,
-            )
+        pd.DataFrame(unmatched_data).to_excel(
+            f"component_warranty_model/Data/{brand}/unmatched_cases.xlsx",
+            index=False,
+        )
 
-            optimizer = (
-                nlp.resume_training()
-                if training_type == "resume"
-                else nlp.begin_training()
-            )
-            batch_size, epochs = calculate_training_params(len(training_data))
+        if training_type == "resume":
+            optimizer = nlp.resume_training()
+        elif export_profile == "ner_only":
+            optimizer = nlp.initialize(lambda: corpus.examples(nlp))
+        else:
+            optimizer = nlp.begin_training()
+        examples = len(corpus)
+        batch_size, max_epochs = calculate_training_params(examples)
+        training = train_until_converged(
+            brand, nlp, optimizer, corpus, batch_size, max_epochs, report
+        )
 
-            # Training loop
-            for epoch in range(epochs):
-                random.shuffle(training_data)
-                for batch in spacy.util.minibatch(training_data, size=batch_size):
-                    nlp.update(batch, sgd=optimizer)
+        if export_profile == "ner_only":
+            strip_to_ner(nlp)
+        # Written beside the live model and renamed into place, since other
+        # processes keep serving this brand meanwhile.
+        staging = staging_model_path(brand)
+        nlp.to_disk(staging)
+        install_model(brand, staging)
+        model_registry.evict(brand)
+        extraction_cache.invalidate(brand)
+        if persistent_cache:
+            persistent_cache.invalidate(brand)
+        result = {
+            "status": "completed",
+            "examples": examples,
+            "unmatched": len(unmatched_data),
+            "corpus": "hit" if cached is not None else "miss",
+            **training,
+        }
+        print(f"Training completed for {brand}!")
 
-            nlp.to_disk(model_path)
-            print(f"Training completed for {brand}!")
+    except Exception as e:
+        result = {"status": "failed", "error": str(e)}
+        print(f"Failed to train model for brand '{brand}': {str(e)}")
+    finally:
+        if corpus_directory:
+            shutil.rmtree(corpus_directory, ignore_errors=True)
+        if staging:
+            shutil.rmtree(staging, ignore_errors=True)
+        if lock_file:
+            lock_file.close()
+
+    report(brand, **result)
+    return result
+
+
+def train_until_converged(
+    brand, nlp, optimizer, corpus, batch_size, max_epochs, report
+):
+    """Train for up to max_epochs, stopping early once the dev score stalls.
+
+    With a dev split, its NER F-score is measured every TRAIN_EVAL_STEPS
+    updates and after the last one. Training stops after TRAIN_PATIENCE
+    scores without improvement, and the weights that scored best are
+    restored. Without a dev split every epoch runs.
+    """
+    dev = corpus.dev
+    best = {"dev_ents_f": None, "step": None, "weights": None}
+    steps = evaluated_step = stalled = epochs_run = 0
+    stopped_early = False
+
+    def evaluate(epoch, losses):
+        nonlocal evaluated_step, stalled
+        evaluated_step = steps
+        ents_f = dev_ents_f(nlp, dev)
+        if best["dev_ents_f"] is None or ents_f > best["dev_ents_f"]:
+            best.update(
+                dev_ents_f=ents_f,
+                step=steps,
+                weights=nlp.to_bytes(exclude=CHECKPOINT_EXCLUDE),
+            )
+            stalled = 0
+        else:
+            stalled += 1
+        report(
+            brand,
+            status="training",
+            epoch=epoch,
+            step=steps,
+            dev_ents_f=round(ents_f, 4),
+            best_dev_ents_f=round(best["dev_ents_f"], 4),
+            losses={name: round(float(loss), 4) for name, loss in losses.items()},
+        )
 
-        except Exception as e:
-            print(f"Failed to train model for brand '{brand}': {str(e)}")
+    for epoch in range(1, max_epochs + 1):
+        losses = {}
+        seen = 0
+        started = time.perf_counter()
+        for batch in corpus.minibatches(nlp, batch_size):
+            nlp.update(batch, sgd=optimizer, losses=losses)
+            steps += 1
+            seen += len(batch)
+            if dev and steps % TRAIN_EVAL_STEPS == 0:
+                evaluate(epoch, losses)
+                if stalled >= TRAIN_PATIENCE:
+                    break
+        epochs_run = epoch
+        report(
+            brand,
+            status="training",
+            epoch=epoch,
+            epochs=max_epochs,
+            examples_per_second=round(seen / (time.perf_counter() - started), 1),
+            losses={name: round(float(loss), 4) for name, loss in losses.items()},
+        )
+        if stalled >= TRAIN_PATIENCE:
+            stopped_early = True
+            break
+
+    if dev and evaluated_step != steps:
+        evaluate(epochs_run, losses)
+    if dev and best["step"] != steps:
+        nlp.from_bytes(best["weights"], exclude=CHECKPOINT_EXCLUDE)
+    return {
+        "epochs_run": epochs_run,
+        "steps": steps,
+        "stopped_early": stopped_early,
+        "best_step": best["step"],
+        "dev_examples": len(dev) if dev else 0,
+        "dev_ents_f": (
+            round(best["dev_ents_f"], 4) if best["dev_ents_f"] is not None else None
+        ),
+    }
+
+
+def dev_ents_f(nlp, dev):
+    """Return the NER F-score of nlp on a dev corpus."""
+    enabled = [name for name in nlp.pipe_names if name in ("tok2vec", "ner")]
+    with nlp.select_pipes(enable=enabled):
+        scores = nlp.evaluate(dev.examples(nlp))
+    return scores.get("ents_f") or 0.0
 
 
 def calculate_training_params(size):
-    """Determine batch size and epochs based on data size."""
+    """Determine batch size and the maximum number of epochs from data size."""
     if size <= 500:
         return 8, 50
     elif size <= 5000:
@@ -119,62 +465,219 @@ def calculate_training_params(size):
     return 128, 10
 
 
+inference_backend = create_inference_backend(warm_up_brands=warm_up_brands())
+training_jobs = TrainingJobManager()
+extraction_jobs = ExtractionJobManager()
+extraction_cache = ExtractionCache()
+persistent_cache = (
+    SQLiteExtractionCache(EXTRACTION_CACHE_DB) if EXTRACTION_CACHE_DB else None
+)
+
+
+def extract_with_cache(brand, texts, extract_misses):
+    """Serve MODEL entities from the caches, running extract_misses on the rest.
+
+    Descriptions are normalized and deduplicated first, so each distinct
+    description is looked up and inferred at most once and its result is
+    scattered back to every position it came from. Lookups go to the
+    in-memory cache first, then to the on-disk cache when EXTRACTION_CACHE_DB
+    is set. Inference runs on the normalized text so that a cached result is
+    exactly what the model returns for that key.
+    """
+    fingerprint = model_fingerprint(brand)
+    keys = [(brand, fingerprint, normalize_description(text)) for text in texts]
+    unique_keys = list(dict.fromkeys(keys))
+
+    found = {}
+    for key in unique_keys:
+        entities = extraction_cache.get(key)
+        if entities is not None:
+            found[key] = entities
+
+    missing = [key for key in unique_keys if key not in found]
+    if missing and persistent_cache:
+        stored = persistent_cache.get_many(missing)
+        for key, entities in stored.items():
+            extraction_cache.put(key, entities)
+        found.update(stored)
+        missing = [key for key in missing if key not in found]
+
+    if missing:
+        computed = extract_misses([key[2] for key in missing])
+        for key, entities in zip(missing, computed):
+            extraction_cache.put(key, entities)
+            found[key] = entities
+        if persistent_cache:
+            persistent_cache.put_many([(key, found[key]) for key in missing])
+
+    return [found[key] for key in keys]
+
+
+def check_brand(brand):
+    """Reject a brand without a trained model.
+
+    Brands come from requests, and every brand that reaches the inference
+    backend keeps a batcher thread and registry entries alive.
+    """
+    if brand not in available_brands():
+        raise HTTPException(status_code=400, detail=f"Unknown brand '{brand}'.")
+
+
+async def extract_description(brand, text):
+    """Extract MODEL entities for one description without blocking the event loop.
+
+    The model fingerprint is only computed on a thread when it has to stat
+    or re-hash the model files.
+    """
+    fingerprint = cached_fingerprint(brand) or await asyncio.to_thread(
+        model_fingerprint, brand
+    )
+    key = (brand, fingerprint, normalize_description(text))
+    entities = extraction_cache.get(key)
+    if entities is None and persistent_cache:
+        entities = (await asyncio.to_thread(persistent_cache.get_many, [key])).get(key)
+    if entities is None:
+        entities = await asyncio.wrap_future(
+            inference_backend.submit_one(brand, key[2])
+        )
+        if persistent_cache:
+            await asyncio.to_thread(persistent_cache.put_many, [(key, entities)])
+    extraction_cache.put(key, entities)
+    return entities
+
+
+def iter_processed_chunks(chunks):
+    """Yield each brand group of each input chunk with its model codes."""
+    for chunk_df in chunks:
+        for brand, group_df in chunk_df.groupby("BRAND", sort=False):
+            check_brand(brand)
+            try:
+                model_codes = extract_with_cache(
+                    brand,
+                    group_df["Model Description"].astype(str).tolist(),
+                    lambda texts: inference_backend.submit(brand, texts).result(),
+                )
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to load model for brand '{brand}': {str(e)}",
+                )
+            yield group_df.assign(
+                **{"Model Code": pd.Series(model_codes, index=group_df.index)}
+            )
+
+
+def process_chunks(chunks):
+    """Process input chunks by brand and return one sorted DataFrame."""
+    return pd.concat(iter_processed_chunks(chunks)).sort_values(
+        by=["BRAND", "Model Description"]
+    )
+
+
 def process_dataframe(df):
     """Group and process DataFrame by brand."""
-    grouped = df.groupby("BRAND")
-    processed_dfs = []
-
-    for brand, group_df in grouped:
-        try:
-            nlp = spacy.load(f"component_warranty_model/spaCy/{brand}/fine_tune_model")
-            group_df["Model Code"] = group_df["Model Description"].apply(
-                lambda desc: [
-                    ent.text for ent in nlp(desc).ents if ent.label_ == "MODEL"
-                ]
-            )
-            processed_dfs.append(group_df)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to load model for brand '{brand}': {str(e)}",
-            )
+    return process_chunks([df])
+
+
+def stream_extracted_records(chunks):
+    """Yield newline-delimited JSON records as each chunk is processed.
+
+    Records come chunk by chunk, grouped by brand within a chunk, rather
+    than sorted. A failure after streaming has started is reported as a
+    final error record.
+    """
+    try:
+        for group_df in iter_processed_chunks(chunks):
+            yield group_df.to_json(orient="records", lines=True).rstrip("\n") + "\n"
+    except Exception as e:
+        yield json.dumps({"status": "error", "detail": str(e)}) + "\n"
+
+
+def check_extract_columns(chunks):
+    """Check the first chunk has the required columns and return all chunks."""
+    first_chunk = next(chunks, None)
+    if first_chunk is None or not {"Brand", "Model Description"}.issubset(
+        first_chunk.columns
+    ):
+        chunks.close()
+        raise HTTPException(
+            status_code=400,
+            detail="The DataFrame must have 'Brand' and 'Model Description' columns.",
+        )
+    return itertools.chain([first_chunk], chunks)
 
-    return pd.concat(processed_dfs).sort_values(by=["BRAND", "Model Description"])
+
+def open_extract_input(s3_obj):
+    """Start reading an upload in chunks and check it has the required columns."""
+    return check_extract_columns(iter_upload_chunks(s3_obj))
 
 
 # FastAPI Endpoints
 @app.post("/train")
 async def train_endpoint(request: TrainRequest):
     try:
-        train_ner_model(request.s3_obj, request.training_type)
-        return {"message": f"Training completed for the data input!"}
+        training_path = await asyncio.to_thread(save_body, request.s3_obj["Body"])
+        job_id = training_jobs.submit(
+            training_path,
+            training_type=request.training_type,
+            export_profile=request.export_profile,
+            ner_width=request.ner_width,
+        )
+        return {"message": "Training job submitted.", "job_id": job_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/train/{job_id}")
+def train_status(job_id: str):
+    status = training_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job '{job_id}'.")
+    return status
+
+
 @app.get("/extract")
-def extract_model_codes(request: ExtractModelRequest):
+async def extract_model_codes(request: ExtractModelRequest):
     try:
         if request.device_details:
             brand, model_desc = (
                 request.device_details["brand"],
                 request.device_details["model"],
             )
-            nlp = spacy.load(f"component_warranty_model/spaCy/{brand}/fine_tune_model")
-            identified_models = [
-                ent.text for ent in nlp(model_desc).ents if ent.label_ == "MODEL"
-            ]
+            check_brand(brand)
+            identified_models = await extract_description(brand, model_desc)
             return {"status": "success", "entities": identified_models or []}
 
         if request.s3_obj:
-            extract_data_df = pd.read_excel(io.BytesIO(request.s3_obj["Body"].read()))
-            if not {"Brand", "Model Description"}.issubset(extract_data_df.columns):
+            if request.output_format != "json" and (
+                request.stream or request.output_format not in OUTPUT_MEDIA_TYPES
+            ):
                 raise HTTPException(
                     status_code=400,
-                    detail="The DataFrame must have 'Brand' and 'Model Description' columns.",
+                    detail="output_format must be 'json', 'parquet' or 'arrow'; "
+                    "streaming is only available for 'json'.",
+                )
+
+            chunks = await asyncio.to_thread(open_extract_input, request.s3_obj)
+            if request.stream:
+                return StreamingResponse(
+                    stream_extracted_records(chunks), media_type="application/x-ndjson"
+                )
+
+            result_df = await asyncio.to_thread(process_chunks, chunks)
+            if request.output_format in OUTPUT_MEDIA_TYPES:
+                content = await asyncio.to_thread(
+                    write_dataframe, result_df, request.output_format
+                )
+                return Response(
+                    content,
+                    media_type=OUTPUT_MEDIA_TYPES[request.output_format],
+                    headers={
+                        "Content-Disposition": "attachment; filename="
+                        f"extracted_models.{request.output_format}"
+                    },
                 )
 
-            result_df = process_dataframe(extract_data_df)
             return {
                 "status": "success",
                 "message": "Model codes extracted successfully.",
@@ -184,14 +687,76 @@ def extract_model_codes(request: ExtractModelRequest):
         raise HTTPException(
             status_code=400, detail="Either device_details or s3_obj must be provided."
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/extract/jobs")
+async def submit_extract_job(request: ExtractJobRequest):
+    try:
+        upload_path = await asyncio.to_thread(save_body, request.s3_obj["Body"])
+        job_id = extraction_jobs.submit(upload_path, request.s3_obj.get("ContentType"))
+        return {"message": "Extraction job submitted.", "job_id": job_id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/extract/jobs/{job_id}")
+def extract_job_status(job_id: str):
+    status = extraction_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown extraction job '{job_id}'."
+        )
+    return status
+
+
+@app.get("/extract/jobs/{job_id}/results")
+def extract_job_results(job_id: str, offset: int = 0, limit: int = 1000):
+    page = extraction_jobs.results(job_id, offset, limit)
+    if page is None:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown extraction job '{job_id}'."
+        )
+    return page
+
+
+@app.get("/extract/jobs/{job_id}/download")
+def download_extract_job(job_id: str):
+    path = extraction_jobs.results_path(job_id)
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No completed extraction job '{job_id}'.",
+        )
+    return FileResponse(
+        path, media_type="application/x-ndjson", filename=f"{job_id}.ndjson"
+    )
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    stats = {"memory": extraction_cache.stats()}
+    if persistent_cache:
+        stats["persistent"] = persistent_cache.stats()
+    return stats
+
+
+@app.get("/ready")
+def ready():
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Models are still warming up.")
+    return {"status": "ready", "loaded_brands": inference_backend.loaded_brands()}
+
+
 @app.get("/")
 def root():
     return {"message": "Hello! Welcome to Model Code Extraction Portal"}
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=9500, reload=True)
+    uvicorn.run(
+        "component_warranty_model.main:app", host="0.0.0.0", port=9500, reload=True
+    )
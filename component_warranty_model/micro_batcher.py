@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# A batch is flushed once it holds MICRO_BATCH_MAX_SIZE texts or the first
+# text in it has waited MICRO_BATCH_WAIT_MS, whichever comes first.
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "32"))
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "5"))
+MICRO_BATCH_IDLE_SECONDS = 60
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-text requests for a brand into one batch.
+
+    submit_batch(brand, texts) must return a Future of one result per text,
+    in order. Each brand gets its own thread, started on first use and
+    stopped after it has been idle for a while. The thread only forms
+    batches and hands them off, keeping up to max_in_flight of a brand's
+    batches running at once; while they all are, texts queue up into
+    larger batches.
+    """
+
+    def __init__(
+        self,
+        submit_batch,
+        max_in_flight=1,
+        max_batch_size=MICRO_BATCH_MAX_SIZE,
+        max_wait_ms=MICRO_BATCH_WAIT_MS,
+        idle_seconds=MICRO_BATCH_IDLE_SECONDS,
+    ):
+        self.submit_batch = submit_batch
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.idle_seconds = idle_seconds
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def submit(self, brand, text):
+        """Queue a text for its brand and return a future for its result."""
+        future = Future()
+        with self._lock:
+            pending = self._queues.get(brand)
+            if pending is None:
+                pending = self._queues[brand] = queue.Queue()
+                threading.Thread(
+                    target=self._worker,
+                    args=(brand, pending),
+                    name=f"micro-batcher-{brand}",
+                    daemon=True,
+                ).start()
+            pending.put((text, future))
+        return future
+
+    def extract(self, brand, text, timeout=None):
+        """Submit a text and block until its batch has been processed."""
+        return self.submit(brand, text).result(timeout)
+
+    def _worker(self, brand, pending):
+        in_flight = threading.Semaphore(self.max_in_flight)
+        while True:
+            try:
+                batch = [pending.get(timeout=self.idle_seconds)]
+            except queue.Empty:
+                with self._lock:
+                    if pending.empty():
+                        del self._queues[brand]
+                        return
+                continue
+
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(
+                        pending.get(timeout=remaining)
+                        if remaining > 0
+                        else pending.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+
+            # Texts whose caller gave up (a client disconnect or timeout
+            # cancels the future) are dropped; the rest can no longer be
+            # cancelled, so delivering their results cannot fail.
+            batch = [
+                (text, future)
+                for text, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            in_flight.acquire()
+            try:
+                submitted = self.submit_batch(brand, [text for text, _ in batch])
+            except Exception as e:
+                in_flight.release()
+                self._fail(batch, e)
+                continue
+            submitted.add_done_callback(
+                lambda done, batch=batch: self._deliver(batch, done, in_flight)
+            )
+
+    def _deliver(self, batch, done, in_flight):
+        in_flight.release()
+        try:
+            results = done.result()
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future in batch:
+            future.set_exception(error)
@@ -0,0 +1,243 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import spacy
+
+MODEL_ROOT = "component_warranty_model/spaCy"
+
+# Registry budget: how many brand pipelines may stay resident, and optionally
+# how many megabytes of model data (0 disables the memory budget).
+MODEL_CACHE_MAX_MODELS = int(os.getenv("MODEL_CACHE_MAX_MODELS", "9"))
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "0"))
+
+# "extract" loads only what the NER component needs; "full" loads the whole
+# pipeline as it was saved.
+MODEL_LOAD_PROFILE = os.getenv("MODEL_LOAD_PROFILE", "extract")
+
+# How often a brand's model files are re-checked for changes on disk.
+FINGERPRINT_CHECK_SECONDS = float(os.getenv("FINGERPRINT_CHECK_SECONDS", "2"))
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+
+def model_path(brand):
+    """Return the fine-tuned model directory for a brand."""
+    return f"{MODEL_ROOT}/{brand}/fine_tune_model"
+
+
+def previous_model_path(brand):
+    """Return where the model replaced by a brand's last retrain is kept."""
+    return f"{MODEL_ROOT}/{brand}/previous_model"
+
+
+def staging_model_path(brand):
+    """Return where this process writes a brand's model before installing it."""
+    return f"{model_path(brand)}.{os.getpid()}.tmp"
+
+
+def install_model(brand, staging):
+    """Swap a model written to staging in as a brand's model.
+
+    The current model moves to previous_model_path(brand). Both steps are
+    renames, so serving processes never load a partially written model.
+    """
+    path = model_path(brand)
+    previous = previous_model_path(brand)
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.isdir(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+
+
+def lock_brand_training(brand):
+    """Block until no other process is training a brand, then hold its lock.
+
+    The lock is a file under the brand's directory, so it also covers
+    trainings started by other server workers. Close the returned file to
+    release it.
+    """
+    path = os.path.join(MODEL_ROOT, brand, ".training.lock")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_file = open(path, "w")
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+
+def available_brands():
+    """Return every brand that has a fine-tuned model on disk."""
+    return sorted(
+        brand
+        for brand in os.listdir(MODEL_ROOT)
+        if os.path.isfile(os.path.join(model_path(brand), "config.cfg"))
+    )
+
+
+def model_size_bytes(path):
+    """Approximate a pipeline's footprint by the size of its files on disk."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def model_fingerprint(brand):
+    """Return a content hash of a brand's model files.
+
+    File sizes and modification times are re-checked at most every
+    FINGERPRINT_CHECK_SECONDS, and the files are only re-hashed when those
+    change, so a retrained model gets a new fingerprint shortly after it is
+    written by any process.
+    """
+    now = time.monotonic()
+    with _fingerprint_lock:
+        cached = _fingerprints.get(brand)
+        if cached and now - cached[0] < FINGERPRINT_CHECK_SECONDS:
+            return cached[2]
+
+    path = model_path(brand)
+    files = sorted(
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+    )
+    signature = [
+        (name, os.stat(name).st_size, os.stat(name).st_mtime_ns) for name in files
+    ]
+
+    if cached and cached[1] == signature:
+        fingerprint = cached[2]
+    else:
+        digest = hashlib.sha256()
+        for name in files:
+            digest.update(os.path.relpath(name, path).encode())
+            with open(name, "rb") as f:
+                digest.update(f.read())
+        fingerprint = digest.hexdigest()[:16]
+
+    # A model directory caught between the renames of install_model is
+    # not remembered, so the next call looks again.
+    if files:
+        with _fingerprint_lock:
+            _fingerprints[brand] = (now, signature, fingerprint)
+    return fingerprint
+
+
+def cached_fingerprint(brand):
+    """Return a brand's fingerprint if it was checked recently, else None.
+
+    Unlike model_fingerprint this never touches the disk, so async code can
+    call it on the event loop and only move to a thread when it misses.
+    """
+    with _fingerprint_lock:
+        cached = _fingerprints.get(brand)
+    if cached and time.monotonic() - cached[0] < FINGERPRINT_CHECK_SECONDS:
+        return cached[2]
+    return None
+
+
+def inference_exclude(path):
+    """List the components the NER component does not depend on."""
+    config = spacy.util.load_config(os.path.join(path, "config.cfg"))
+    pipeline = config["nlp"]["pipeline"]
+    if "ner" not in pipeline:
+        return []
+
+    required = {"ner"}
+    tok2vec = config["components"]["ner"]["model"].get("tok2vec", {})
+    if tok2vec.get("@architectures", "").startswith("spacy.Tok2VecListener"):
+        upstream = tok2vec.get("upstream", "*")
+        required.update(pipeline if upstream == "*" else [upstream])
+    return [name for name in pipeline if name not in required]
+
+
+def load_model(brand, profile=MODEL_LOAD_PROFILE):
+    """Load a brand pipeline using the given loading profile."""
+    path = model_path(brand)
+    if profile == "full":
+        return spacy.load(path)
+    if profile == "extract":
+        return spacy.load(path, exclude=inference_exclude(path))
+    raise ValueError(f"Unknown model load profile '{profile}'.")
+
+
+class ModelRegistry:
+    """Process-wide store of loaded brand pipelines with LRU eviction."""
+
+    def __init__(
+        self,
+        max_models=MODEL_CACHE_MAX_MODELS,
+        max_mb=MODEL_CACHE_MAX_MB,
+        profile=MODEL_LOAD_PROFILE,
+    ):
+        self.profile = profile
+        self.max_models = max(1, max_models)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, brand):
+        """Return the pipeline for a brand, loading it on first use.
+
+        A resident pipeline is reloaded when its files on disk have changed.
+        """
+        fingerprint = model_fingerprint(brand)
+        with self._lock:
+            if self._is_current(brand, fingerprint):
+                self._models.move_to_end(brand)
+                return self._models[brand][0]
+            load_lock = self._load_locks.setdefault(brand, threading.Lock())
+
+        # Only one thread loads a given brand; the others wait and reuse it.
+        with load_lock:
+            with self._lock:
+                if self._is_current(brand, fingerprint):
+                    self._models.move_to_end(brand)
+                    return self._models[brand][0]
+
+            nlp = load_model(brand, self.profile)
+            size = model_size_bytes(model_path(brand))
+
+            with self._lock:
+                self._models[brand] = (nlp, size, fingerprint)
+                self._models.move_to_end(brand)
+                self._enforce_budget()
+            return nlp
+
+    def evict(self, brand):
+        """Drop a brand's pipeline so the next request reloads it from disk."""
+        with self._lock:
+            self._models.pop(brand, None)
+
+    def clear(self):
+        """Drop every resident pipeline."""
+        with self._lock:
+            self._models.clear()
+
+    def loaded_brands(self):
+        """Return resident brands, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def _is_current(self, brand, fingerprint):
+        return brand in self._models and self._models[brand][2] == fingerprint
+
+    def _enforce_budget(self):
+        # Always keep the most recently used pipeline, even if it alone
+        # exceeds the memory budget.
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_models
+            or (self.max_bytes and self._resident_bytes() > self.max_bytes)
+        ):
+            self._models.popitem(last=False)
+
+    def _resident_bytes(self):
+        return sum(size for _, size, _ in self._models.values())
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,154 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+import uvicorn_config
+from component_warranty_model.inference_backends import (
+    INFERENCE_BACKEND,
+    warm_up_in_process,
+)
+from component_warranty_model.main import app, warm_up_brands
+from component_warranty_model.model_registry import model_registry
+
+# Production entry point that loads every brand pipeline once in the master
+# process and then forks the uvicorn workers, so the read-only model weights
+# are shared copy-on-write instead of being loaded again by each worker.
+# Linux only (fork and /proc).
+#
+#   SERVER_WORKERS=8 python -m component_warranty_model.serve
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(uvicorn_config.workers)))
+MEMORY_REPORT_DELAY_SECONDS = float(os.getenv("MEMORY_REPORT_DELAY_SECONDS", "10"))
+
+SMAPS_FIELDS = (
+    "Rss",
+    "Pss",
+    "Shared_Clean",
+    "Shared_Dirty",
+    "Private_Clean",
+    "Private_Dirty",
+)
+
+
+def read_memory(pid):
+    """Return a process's memory breakdown in MB from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in SMAPS_FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return {
+        "rss_mb": round(values["Rss"], 1),
+        "pss_mb": round(values["Pss"], 1),
+        "shared_mb": round(values["Shared_Clean"] + values["Shared_Dirty"], 1),
+        "unique_mb": round(values["Private_Clean"] + values["Private_Dirty"], 1),
+    }
+
+
+def memory_report(master_pid, worker_pids):
+    """Print unique vs shared memory for the master and every worker."""
+    print("Memory report (MB):")
+    for role, pid in [("master", master_pid)] + [("worker", p) for p in worker_pids]:
+        try:
+            usage = read_memory(pid)
+        except OSError:
+            continue
+        print(
+            f"  {role} {pid}: rss={usage['rss_mb']} pss={usage['pss_mb']} "
+            f"shared={usage['shared_mb']} unique={usage['unique_mb']}"
+        )
+
+
+def preload_models():
+    """Load and warm every brand in the master before any worker is forked."""
+    if INFERENCE_BACKEND != "local":
+        print("Preloading only helps the local inference backend; skipping it.")
+        return
+    brands = warm_up_brands()
+    model_registry.max_models = max(model_registry.max_models, len(brands))
+    warm_up_in_process(brands)
+
+    # Move everything loaded so far out of the collector's generations so
+    # that garbage collection in the workers does not touch (and so copy)
+    # the pages holding the shared models.
+    gc.collect()
+    gc.freeze()
+
+
+def bind_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((uvicorn_config.host, uvicorn_config.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn_worker(sock):
+    """Fork a worker that serves the app on the shared listening socket."""
+    pid = os.fork()
+    if pid:
+        return pid
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        uvicorn.Server(uvicorn.Config(app, log_level=uvicorn_config.log_level)).run(
+            sockets=[sock]
+        )
+    finally:
+        os._exit(0)
+
+
+def serve():
+    preload_models()
+    sock = bind_socket()
+    workers = {spawn_worker(sock) for _ in range(max(1, SERVER_WORKERS))}
+    print(
+        f"Serving on {uvicorn_config.host}:{uvicorn_config.port} "
+        f"with {len(workers)} forked workers"
+    )
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    report_at = time.monotonic() + MEMORY_REPORT_DELAY_SECONDS
+    while workers:
+        if report_at and time.monotonic() >= report_at:
+            memory_report(os.getpid(), sorted(workers))
+            report_at = None
+
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if not pid:
+            time.sleep(0.5)
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; starting a new one")
+            time.sleep(1)
+            workers.add(spawn_worker(sock))
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    if not hasattr(os, "fork"):
+        sys.exit("The preload-then-fork server needs a platform with os.fork.")
+    serve()
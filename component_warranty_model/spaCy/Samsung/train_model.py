@@ -6,8 +6,27 @@ from spacy.training.example import Example
 from spacy.training import offsets_to_biluo_tags
 from spacy.tokenizer import Tokenizer
 
+from component_warranty_model.training_corpus import split_dev_rows
+
+# Set to True to save only the NER component; /extract never reads the
+# tagger, parser or lemmatizer output. The NER-only model is trained from a
+# blank pipeline whose NER token vectors are NER_WIDTH wide.
+NER_ONLY_EXPORT = False
+NER_WIDTH = 96
+
+# Training stops once the NER F-score on the dev rows has not improved for
+# PATIENCE checks, made every EVAL_EVERY_STEPS updates, and keeps the best
+# weights. Dev rows are held out like the service does, by distinct
+# description and only when the sheet has enough of them.
+EVAL_EVERY_STEPS = 100
+PATIENCE = 5
+
 # Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+if NER_ONLY_EXPORT:
+    nlp = spacy.blank("en")
+    nlp.add_pipe("ner", config={"model": {"tok2vec": {"width": NER_WIDTH}}})
+else:
+    nlp = spacy.load("en_core_web_sm")
 
 # Custom tokenizer to prevent splitting on spaces, hyphens, and other special characters
 infix_re = re.compile(r'''[.\-/():#|]''')  # Customize for dots, hyphens, colons, parentheses
@@ -57,11 +76,13 @@ def check_alignment(text, entities):
     biluo_tags = offsets_to_biluo_tags(doc, entities)
     print("Alignment check:", biluo_tags)
 
-# Prepare training data and unmatched data
+# Prepare training data, dev data and unmatched data
+dev_index = set(split_dev_rows(df)[1].index)
 training_data = []
+dev_data = []
 unmatched_data = []
 
-for _, row in df.iterrows():
+for index, row in df.iterrows():
     text = row['Model Description']
     extracted_model = row['Model Code']
 
@@ -72,7 +93,8 @@ for _, row in df.iterrows():
         check_alignment(text, entities)
         annotations = {"entities": entities}
         doc = nlp.make_doc(text)
-        training_data.append(Example.from_dict(doc, annotations))
+        example = Example.from_dict(doc, annotations)
+        (dev_data if index in dev_index else training_data).append(example)
     else:
         unmatched_data.append({
             "text": text,
@@ -85,7 +107,10 @@ unmatched_df = pd.DataFrame(unmatched_data)
 unmatched_df.to_excel("component_warranty_model/Data/Samsung/unmatched_cases.xlsx", index=False)
 
 # Set up the optimizer for training
-optimizer = nlp.begin_training()
+if NER_ONLY_EXPORT:
+    optimizer = nlp.initialize(lambda: training_data)
+else:
+    optimizer = nlp.begin_training()
 
 def calculate_training_params(training_data_size):
     """
@@ -109,11 +134,35 @@ batch_size, epochs = calculate_training_params(training_data_size)
 print(f"Training data size: {training_data_size}")
 print(f"Batch size: {batch_size}, Epochs: {epochs}")
 
-# Training loop
+# Training loop; with dev rows, epochs is an upper bound
+best_score, best_weights, stalled, step = None, None, 0, 0
 for epoch in range(epochs):
     random.shuffle(training_data)
     for batch in spacy.util.minibatch(training_data, size=batch_size):
         nlp.update(batch, sgd=optimizer)
+        step += 1
+        if dev_data and step % EVAL_EVERY_STEPS == 0:
+            score = nlp.evaluate(dev_data)["ents_f"] or 0.0
+            print(f"Step {step}: dev F-score {score:.4f}")
+            if best_score is None or score > best_score:
+                best_score, stalled = score, 0
+                best_weights = nlp.to_bytes(exclude=["tokenizer", "vocab"])
+            else:
+                stalled += 1
+            if stalled >= PATIENCE:
+                break
+    if stalled >= PATIENCE:
+        print(f"Stopping early after epoch {epoch + 1}")
+        break
+
+# Restore the best weights if the last updates did not improve on them
+if best_weights and (nlp.evaluate(dev_data)["ents_f"] or 0.0) < best_score:
+    nlp.from_bytes(best_weights, exclude=["tokenizer", "vocab"])
+
+# Drop every component except NER for a compact artifact
+if NER_ONLY_EXPORT:
+    for name in [name for name in nlp.component_names if name != "ner"]:
+        nlp.remove_pipe(name)
 
 # Save the fine-tuned model
 nlp.to_disk("component_warranty_model/spaCy/Samsung/fine_tune_model")
@@ -0,0 +1,293 @@
+import functools
+import json
+import os
+import random
+import re
+
+import pandas as pd
+import spacy
+from spacy.tokenizer import Tokenizer
+from spacy.tokens import Doc, DocBin, Span
+from spacy.training import Example
+
+from component_warranty_model.worker_pool import create_process_pool
+
+# Characters the custom tokenizer splits tokens on.
+INFIX_PATTERN = r"[.\-/():#|+]"
+
+# Distinct model codes whose compiled patterns are kept between calls.
+MODEL_PATTERN_CACHE_SIZE = 100000
+
+# Large training sheets are aligned and tokenized in up to TRAIN_PREP_WORKERS
+# processes; sheets under TRAIN_PREP_MIN_ROWS rows are not worth the cost of
+# starting them.
+TRAIN_PREP_WORKERS = int(os.getenv("TRAIN_PREP_WORKERS", str(os.cpu_count() or 1)))
+TRAIN_PREP_MIN_ROWS = int(os.getenv("TRAIN_PREP_MIN_ROWS", "20000"))
+
+# Token attributes kept when reference docs are serialized; NER training
+# needs nothing but the text and the entity annotation.
+DOC_BIN_ATTRS = ["ORTH", "ENT_IOB", "ENT_TYPE"]
+
+# Training corpora are written to disk as DocBin shards of TRAIN_SHARD_ROWS
+# sheet rows and streamed back every epoch through a shuffle buffer of
+# TRAIN_SHUFFLE_BUFFER examples, so memory does not grow with the corpus.
+TRAIN_SHARD_ROWS = int(os.getenv("TRAIN_SHARD_ROWS", "2000"))
+TRAIN_SHUFFLE_BUFFER = int(os.getenv("TRAIN_SHUFFLE_BUFFER", "10000"))
+CORPUS_INDEX = "corpus.json"
+
+# A share of the distinct descriptions of a sheet, at most TRAIN_DEV_MAX_ROWS,
+# is held out as a dev split that training is evaluated on; sheets that
+# would give fewer than TRAIN_DEV_MIN_ROWS are trained on in full.
+TRAIN_DEV_FRACTION = float(os.getenv("TRAIN_DEV_FRACTION", "0.1"))
+TRAIN_DEV_MIN_ROWS = int(os.getenv("TRAIN_DEV_MIN_ROWS", "20"))
+TRAIN_DEV_MAX_ROWS = int(os.getenv("TRAIN_DEV_MAX_ROWS", "5000"))
+DEV_DIRECTORY = "dev"
+
+
+def configure_tokenizer(nlp):
+    """Configure custom tokenizer for special characters."""
+    nlp.tokenizer = Tokenizer(
+        nlp.vocab, infix_finditer=re.compile(INFIX_PATTERN).finditer
+    )
+
+
+@functools.lru_cache(maxsize=MODEL_PATTERN_CACHE_SIZE)
+def model_code_pattern(extracted_model):
+    """Compile the pattern matching a model code with loose separators.
+
+    Hyphens, dots and the characters #|+() in a code may each be repeated
+    or mixed with whitespace in the description. Backslashes in the re.sub
+    template are doubled, since a bare \\s there is a bad escape.
+    """
+    pattern = (
+        re.escape(extracted_model).replace(r"\-", r"[-\s]*").replace(r"\.", r"[.\s]*")
+    )
+    pattern = re.sub(r"\\([#|+()])", r"[\\\1\\s]*", pattern)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def align_model_spans(texts, codes):
+    """Locate each model code in its description, a whole column at a time.
+
+    Returns a DataFrame with text, extracted_model, start and end columns;
+    start and end are -1 where the code was not found.
+    """
+    starts, ends = [], []
+    for text, code in zip(texts, codes):
+        match = (
+            model_code_pattern(code).search(text)
+            if isinstance(text, str) and isinstance(code, str)
+            else None
+        )
+        starts.append(match.start() if match else -1)
+        ends.append(match.end() if match else -1)
+    return pd.DataFrame(
+        {"text": texts, "extracted_model": codes, "start": starts, "end": ends}
+    )
+
+
+def model_reference(doc, start, end):
+    """Return the reference doc annotating one MODEL span in a description.
+
+    A span on token boundaries is set directly on doc; one that is not goes
+    through Example.from_dict, which marks the tokens it cuts through as
+    missing, exactly as before.
+    """
+    span = doc.char_span(start, end)
+    if span is None:
+        return Example.from_dict(doc, {"entities": [(start, end, "MODEL")]}).reference
+    doc.set_ents([Span(doc, span.start, span.end, "MODEL")], default="outside")
+    return doc
+
+
+def build_references(nlp, df):
+    """Align and tokenize a DataFrame of training rows in this process.
+
+    Returns the annotated reference docs of the matched rows, and the
+    unmatched rows.
+    """
+    aligned = align_model_spans(
+        df["Model Description"].tolist(), df["Model Code"].tolist()
+    )
+    matched = aligned[aligned["start"] >= 0]
+    docs = nlp.tokenizer.pipe(matched["text"].tolist())
+    references = [
+        model_reference(doc, start, end)
+        for doc, start, end in zip(
+            docs, matched["start"].tolist(), matched["end"].tolist()
+        )
+    ]
+    unmatched_data = aligned.loc[
+        aligned["start"] < 0, ["text", "extracted_model"]
+    ].reset_index(drop=True)
+    return references, unmatched_data
+
+
+@functools.lru_cache(maxsize=1)
+def preparation_pipeline():
+    """Return the blank pipeline a preparation worker tokenizes with."""
+    nlp = spacy.blank("en")
+    configure_tokenizer(nlp)
+    return nlp
+
+
+def prepare_shard(texts, codes):
+    """Prepare one shard of rows in a worker process.
+
+    The annotated reference docs are returned as DocBin bytes, which are
+    much cheaper to send back than pickled Examples.
+    """
+    references, unmatched_data = build_references(
+        preparation_pipeline(),
+        pd.DataFrame({"Model Description": texts, "Model Code": codes}),
+    )
+    return DocBin(attrs=DOC_BIN_ATTRS, docs=references).to_bytes(), unmatched_data
+
+
+def examples_from_doc_bin(nlp, data):
+    """Rebuild Examples from serialized reference docs.
+
+    The predicted side gets the same tokens without annotations, which is
+    what the tokenizer produced for it in the worker.
+    """
+    strings = nlp.vocab.strings
+    for reference in DocBin().from_bytes(data).get_docs(nlp.vocab):
+        tokens = reference.to_array(["ORTH", "SPACY"]).tolist()
+        predicted = Doc(
+            nlp.vocab,
+            words=[strings[orth] for orth, _ in tokens],
+            spaces=[bool(space) for _, space in tokens],
+        )
+        yield Example(predicted, reference)
+
+
+def split_dev_rows(df):
+    """Split rows into training and dev rows by distinct description.
+
+    Every copy of a held-out description goes to the dev rows, so none of
+    them is also trained on. The split is the same for the same sheet.
+    """
+    descriptions = df["Model Description"].astype(str)
+    distinct = descriptions.drop_duplicates()
+    dev_rows = min(int(len(distinct) * TRAIN_DEV_FRACTION), TRAIN_DEV_MAX_ROWS)
+    if dev_rows < TRAIN_DEV_MIN_ROWS:
+        return df, df.iloc[:0]
+    is_dev = descriptions.isin(distinct.sample(n=dev_rows, random_state=0))
+    return df[~is_dev], df[is_dev]
+
+
+def write_corpus(nlp, df, directory, max_workers=1, dev_split=False):
+    """Align and tokenize training rows into DocBin shards under directory.
+
+    Returns the ShardedCorpus of the rows whose model code was found in the
+    description, and the other rows as a DataFrame with text and
+    extracted_model columns. With dev_split, rows picked by split_dev_rows
+    are written to a dev corpus instead, available as corpus.dev. With
+    max_workers > 1, large sheets are prepared in parallel; nlp must then
+    use the tokenizer set by configure_tokenizer, as the workers do.
+    """
+    unmatched = []
+    if dev_split:
+        df, dev_df = split_dev_rows(df)
+        if len(dev_df):
+            _, dev_unmatched = write_corpus(
+                nlp, dev_df, os.path.join(directory, DEV_DIRECTORY), max_workers
+            )
+            unmatched.append(dev_unmatched)
+
+    texts = df["Model Description"].tolist()
+    codes = df["Model Code"].tolist()
+    bounds = range(0, len(texts), TRAIN_SHARD_ROWS)
+    texts_by_shard = (texts[start : start + TRAIN_SHARD_ROWS] for start in bounds)
+    codes_by_shard = (codes[start : start + TRAIN_SHARD_ROWS] for start in bounds)
+
+    os.makedirs(directory, exist_ok=True)
+    shards = []
+
+    def write_shard(data, unmatched_data):
+        doc_bin = DocBin().from_bytes(data)
+        if len(doc_bin):
+            path = f"shard-{len(shards):05d}.spacy"
+            with open(os.path.join(directory, path), "wb") as f:
+                f.write(data)
+            shards.append({"path": path, "examples": len(doc_bin)})
+        unmatched.append(unmatched_data)
+
+    if max_workers <= 1 or len(texts) < TRAIN_PREP_MIN_ROWS:
+        for shard_texts, shard_codes in zip(texts_by_shard, codes_by_shard):
+            references, unmatched_data = build_references(
+                nlp,
+                pd.DataFrame(
+                    {"Model Description": shard_texts, "Model Code": shard_codes}
+                ),
+            )
+            write_shard(
+                DocBin(attrs=DOC_BIN_ATTRS, docs=references).to_bytes(),
+                unmatched_data,
+            )
+    else:
+        with create_process_pool(min(max_workers, len(bounds))) as pool:
+            for data, unmatched_data in pool.map(
+                prepare_shard, texts_by_shard, codes_by_shard
+            ):
+                write_shard(data, unmatched_data)
+
+    with open(os.path.join(directory, CORPUS_INDEX), "w") as f:
+        json.dump({"shards": shards}, f)
+    unmatched_data = (
+        pd.concat(unmatched, ignore_index=True)
+        if unmatched
+        else pd.DataFrame(columns=["text", "extracted_model"])
+    )
+    return ShardedCorpus(directory), unmatched_data
+
+
+class ShardedCorpus:
+    """Training examples stored on disk as DocBin shards.
+
+    Only one shard and the shuffle buffer are held in memory at a time, so
+    a corpus can be trained on for any number of epochs without keeping
+    its Examples around. dev is the corpus of the held-out dev split, or
+    None when there is none.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, CORPUS_INDEX)) as f:
+            self.shards = json.load(f)["shards"]
+        dev_directory = os.path.join(directory, DEV_DIRECTORY)
+        self.dev = (
+            ShardedCorpus(dev_directory)
+            if os.path.exists(os.path.join(dev_directory, CORPUS_INDEX))
+            else None
+        )
+
+    def __len__(self):
+        return sum(shard["examples"] for shard in self.shards)
+
+    def examples(self, nlp, shuffle=False):
+        """Yield the Examples of every shard, in random shard order if shuffle."""
+        shards = list(self.shards)
+        if shuffle:
+            random.shuffle(shards)
+        for shard in shards:
+            with open(os.path.join(self.directory, shard["path"]), "rb") as f:
+                data = f.read()
+            yield from examples_from_doc_bin(nlp, data)
+
+    def shuffled(self, nlp, buffer_size=TRAIN_SHUFFLE_BUFFER):
+        """Yield the Examples in random order using a bounded shuffle buffer."""
+        buffer = []
+        for example in self.examples(nlp, shuffle=True):
+            if len(buffer) < buffer_size:
+                buffer.append(example)
+                continue
+            index = random.randrange(buffer_size)
+            yield buffer[index]
+            buffer[index] = example
+        random.shuffle(buffer)
+        yield from buffer
+
+    def minibatches(self, nlp, size, buffer_size=TRAIN_SHUFFLE_BUFFER):
+        """Yield shuffled minibatches of one epoch."""
+        return spacy.util.minibatch(self.shuffled(nlp, buffer_size), size=size)
@@ -0,0 +1,185 @@
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+# Training jobs run in separate processes so that CPU-bound training never
+# blocks the event loop serving /extract. Retrains of the same brand never
+# write its model directory at once, even from different server workers:
+# train_brand_model holds a lock file per brand while it runs.
+TRAIN_JOB_WORKERS = int(os.getenv("TRAIN_JOB_WORKERS", "1"))
+TRAIN_JOBS_KEPT = 100
+
+# Job status and per-brand progress are kept as JSON files under
+# TRAIN_JOB_DIR/<job_id>, so any server worker can answer /train/{job_id}.
+TRAIN_JOB_DIR = os.getenv(
+    "TRAIN_JOB_DIR", os.path.join(tempfile.gettempdir(), "training_jobs")
+)
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def write_json(path, value):
+    """Replace a JSON file in one step, so readers never see a partial file."""
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(value, f)
+    os.replace(temporary, path)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class ProgressReporter:
+    """Picklable progress callback that writes each brand's status to a file.
+
+    Every brand is trained by a single process, so each file has one writer.
+    """
+
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self.progress = {}
+
+    def __call__(self, brand, **status):
+        self.progress[brand] = {**self.progress.get(brand, {}), **status}
+        name = re.sub(r"[^\w.-]", "_", str(brand))
+        write_json(
+            os.path.join(self.job_dir, "brands", f"{name}.json"),
+            {"brand": str(brand), **self.progress[brand]},
+        )
+
+
+def update_job(job_dir, **fields):
+    """Merge fields into a job's status file."""
+    path = os.path.join(job_dir, "status.json")
+    write_json(path, {**read_json(path), **fields})
+
+
+def run_training_job(training_path, job_dir, options):
+    """Train from an uploaded file saved by the API, then delete the file."""
+    from component_warranty_model.main import train_ner_model
+
+    update_job(job_dir, status="running", started_at=time.time())
+    try:
+        with open(training_path, "rb") as f:
+            summary = train_ner_model(
+                {"Body": f}, progress_callback=ProgressReporter(job_dir), **options
+            )
+    finally:
+        os.remove(training_path)
+    update_job(
+        job_dir,
+        status="completed_with_errors" if summary["failed"] else "completed",
+        finished_at=time.time(),
+        summary=summary,
+    )
+    return summary
+
+
+class TrainingJobManager:
+    """Submit training runs to worker processes and track their progress."""
+
+    def __init__(self, max_workers=TRAIN_JOB_WORKERS, job_dir=TRAIN_JOB_DIR):
+        self.max_workers = max_workers
+        self.job_dir = job_dir
+        self._context = multiprocessing.get_context("spawn")
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, training_path, **options):
+        """Queue a training run on a saved upload and return its job id."""
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.job_dir, job_id)
+        os.makedirs(os.path.join(job_dir, "brands"))
+        write_json(
+            os.path.join(job_dir, "status.json"),
+            {
+                "job_id": job_id,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "options": options,
+            },
+        )
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, mp_context=self._context
+                )
+            future = self._executor.submit(
+                run_training_job, training_path, job_dir, options
+            )
+        future.add_done_callback(
+            lambda future: self._record_failure(job_dir, training_path, future)
+        )
+        self._prune()
+        return job_id
+
+    def status(self, job_id):
+        """Return a snapshot of a job, or None if the id is unknown."""
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        job_dir = os.path.join(self.job_dir, job_id)
+        try:
+            snapshot = read_json(os.path.join(job_dir, "status.json"))
+            brand_files = os.listdir(os.path.join(job_dir, "brands"))
+        except (OSError, ValueError):
+            return None
+
+        snapshot["brands"] = {}
+        for name in sorted(brand_files):
+            if name.endswith(".json"):
+                progress = read_json(os.path.join(job_dir, "brands", name))
+                snapshot["brands"][progress.pop("brand")] = progress
+        return snapshot
+
+    def shutdown(self, cancel_pending=False):
+        """Stop the worker processes once running jobs have finished.
+
+        With cancel_pending, queued jobs that have not started are cancelled
+        instead of being run first.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+                self._executor = None
+
+    @staticmethod
+    def _record_failure(job_dir, training_path, future):
+        if future.cancelled():
+            os.remove(training_path)
+            update_job(job_dir, status="cancelled", finished_at=time.time())
+            return
+        error = future.exception()
+        if error is not None:
+            update_job(
+                job_dir, status="failed", error=str(error), finished_at=time.time()
+            )
+
+    def _prune(self):
+        # Drop the oldest finished jobs of any server worker past the limit.
+        try:
+            entries = sorted(
+                (entry for entry in os.scandir(self.job_dir) if entry.is_dir()),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+        except OSError:
+            return
+        for entry in entries[: max(0, len(entries) - TRAIN_JOBS_KEPT)]:
+            try:
+                finished = read_json(os.path.join(entry.path, "status.json"))[
+                    "finished_at"
+                ]
+            except (OSError, ValueError, KeyError):
+                continue
+            if finished:
+                shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,56 @@
+import sys
+
+from component_warranty_model.data_files import load_descriptions
+from component_warranty_model.model_registry import available_brands, load_model
+
+# Check that the "extract" loading profile returns exactly the same MODEL
+# entities as the full pipeline on each brand's historical descriptions.
+#
+#   python -m component_warranty_model.verify_extract_profile [Brand ...]
+
+
+def model_entities(nlp, texts):
+    """Return the MODEL entities found in each text."""
+    return [
+        [
+            (ent.start_char, ent.end_char, ent.text)
+            for ent in doc.ents
+            if ent.label_ == "MODEL"
+        ]
+        for doc in nlp.pipe(texts)
+    ]
+
+
+def verify_brand(brand):
+    """Compare both profiles for a brand and return the mismatching texts."""
+    full_nlp = load_model(brand, "full")
+    extract_nlp = load_model(brand, "extract")
+    texts = load_descriptions(brand)
+
+    mismatches = [
+        (text, full, slim)
+        for text, full, slim in zip(
+            texts, model_entities(full_nlp, texts), model_entities(extract_nlp, texts)
+        )
+        if full != slim
+    ]
+    print(
+        f"{brand}: {len(texts)} descriptions, {len(mismatches)} mismatches "
+        f"(full: {full_nlp.pipe_names}, extract: {extract_nlp.pipe_names})"
+    )
+    for text, full, slim in mismatches[:10]:
+        print(f"  {text!r}: full={full} extract={slim}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    brands = sys.argv[1:] or available_brands()
+    failed = []
+    for brand in brands:
+        try:
+            if verify_brand(brand):
+                failed.append(brand)
+        except Exception as e:
+            print(f"{brand}: could not be verified: {str(e)}")
+            failed.append(brand)
+    sys.exit(1 if failed else 0)
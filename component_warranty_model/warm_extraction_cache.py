@@ -0,0 +1,40 @@
+import sys
+
+from component_warranty_model.data_files import load_descriptions
+from component_warranty_model.extraction_cache import EXTRACTION_CACHE_DB
+from component_warranty_model.inference_backends import EXTRACT_BATCH_SIZE
+from component_warranty_model.main import extract_with_cache, inference_backend
+from component_warranty_model.model_registry import available_brands
+
+# Fill the on-disk extraction cache from the historical descriptions kept in
+# component_warranty_model/Data/<brand>/extracted_models_*.xlsx, so bulk jobs
+# after a deploy mostly read cached results.
+#
+#   EXTRACTION_CACHE_DB=/var/cache/extraction.sqlite3 \
+#       python -m component_warranty_model.warm_extraction_cache [Brand ...]
+
+WARM_UP_CHUNK_SIZE = EXTRACT_BATCH_SIZE * 8
+
+
+def warm_brand(brand):
+    """Run every historical description of a brand through the caches."""
+    descriptions = load_descriptions(brand)
+    for start in range(0, len(descriptions), WARM_UP_CHUNK_SIZE):
+        extract_with_cache(
+            brand,
+            descriptions[start : start + WARM_UP_CHUNK_SIZE],
+            lambda texts: inference_backend.submit(brand, texts).result(),
+        )
+    return len(descriptions)
+
+
+if __name__ == "__main__":
+    if not EXTRACTION_CACHE_DB:
+        sys.exit("Set EXTRACTION_CACHE_DB to the cache database path first.")
+
+    for brand in sys.argv[1:] or available_brands():
+        try:
+            print(f"{brand}: {warm_brand(brand)} descriptions cached")
+        except Exception as e:
+            print(f"Failed to warm cache for brand '{brand}': {str(e)}")
+    inference_backend.shutdown()
@@ -0,0 +1,109 @@
+import functools
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+# Brands are trained concurrently, one per worker process. Each worker is
+# capped to a few BLAS/OpenMP threads so that workers do not oversubscribe
+# the cores between them.
+TRAIN_BRAND_WORKERS = int(os.getenv("TRAIN_BRAND_WORKERS", str(os.cpu_count() or 1)))
+TRAIN_THREADS_PER_WORKER = int(os.getenv("TRAIN_THREADS_PER_WORKER", "1"))
+
+THREAD_LIMIT_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# Serializes the environment changes around starting a worker process.
+_environment_lock = threading.Lock()
+
+
+@contextmanager
+def thread_limit_environment(threads):
+    """Set the thread limit variables of this process for the duration.
+
+    Threads of None leaves them alone.
+    """
+    if threads is None:
+        yield
+        return
+
+    with _environment_lock:
+        saved = {name: os.environ.get(name) for name in THREAD_LIMIT_VARIABLES}
+        os.environ.update({name: str(threads) for name in THREAD_LIMIT_VARIABLES})
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+class ThreadLimitedProcess(multiprocessing.context.SpawnProcess):
+    """Spawned process started with the thread limit variables set."""
+
+    def __init__(self, *args, thread_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread_limit = thread_limit
+
+    def start(self):
+        with thread_limit_environment(self.thread_limit):
+            super().start()
+
+
+def thread_limited_context(threads):
+    """Return a spawn context whose processes start with capped threads.
+
+    A spawned worker re-imports the parent's __main__ module before its
+    initializer runs, and under python -m component_warranty_model.serve
+    that already imports numpy and spaCy. The limits are therefore put in
+    the environment the worker is started with, where their thread pools
+    read them on import.
+    """
+    context = multiprocessing.context.SpawnContext()
+    context.Process = functools.partial(ThreadLimitedProcess, thread_limit=threads)
+    return context
+
+
+def init_worker(threads, setup=None, setup_args=()):
+    """Cap native thread pools in a freshly spawned worker, then run setup.
+
+    The worker already started with the limits in its environment (see
+    thread_limited_context); they are set again here for anything that
+    reads them later. setup is given as a "module:function" string and
+    only imported now. Threads of None leave the native thread pools
+    uncapped.
+    """
+    if threads is not None:
+        for name in THREAD_LIMIT_VARIABLES:
+            os.environ[name] = str(threads)
+
+    if setup:
+        module_name, function_name = setup.split(":")
+        getattr(importlib.import_module(module_name), function_name)(*setup_args)
+
+
+def create_process_pool(max_workers, threads_per_worker=1, setup=None, setup_args=()):
+    """Create a spawn-based process pool for CPU-bound work."""
+    return ProcessPoolExecutor(
+        max_workers=max(1, max_workers),
+        mp_context=thread_limited_context(threads_per_worker),
+        initializer=init_worker,
+        initargs=(threads_per_worker, setup, setup_args),
+    )
+
+
+def create_training_pool(
+    max_workers=TRAIN_BRAND_WORKERS, threads_per_worker=TRAIN_THREADS_PER_WORKER
+):
+    """Create a process pool for per-brand training."""
+    return create_process_pool(max_workers, threads_per_worker)
@@ -0,0 +1,68 @@
+import threading
+import unittest
+from concurrent.futures import Future
+
+from component_warranty_model.micro_batcher import MicroBatcher
+
+
+class HeldBatches:
+    """submit_batch stand-in whose batches finish only when released."""
+
+    def __init__(self):
+        self.batches = []
+        self.submitted = threading.Event()
+
+    def __call__(self, brand, texts):
+        future = Future()
+        self.batches.append((texts, future))
+        self.submitted.set()
+        return future
+
+    def release(self):
+        for texts, future in self.batches:
+            future.set_result([text.upper() for text in texts])
+
+
+class MicroBatcherTest(unittest.TestCase):
+    def test_batches_concurrent_texts(self):
+        held = HeldBatches()
+        batcher = MicroBatcher(held, max_wait_ms=200)
+        futures = [batcher.submit("Sony", text) for text in ("a", "b", "c")]
+        self.assertTrue(held.submitted.wait(5))
+        held.release()
+
+        self.assertEqual([future.result(5) for future in futures], ["A", "B", "C"])
+        self.assertEqual([texts for texts, _ in held.batches], [["a", "b", "c"]])
+
+    def test_cancelled_text_does_not_hold_up_its_batch(self):
+        held = HeldBatches()
+        batcher = MicroBatcher(held, max_wait_ms=200)
+        cancelled = batcher.submit("Sony", "a")
+        waiting = batcher.submit("Sony", "b")
+        self.assertTrue(cancelled.cancel())
+        self.assertTrue(held.submitted.wait(5))
+        held.release()
+
+        self.assertEqual(waiting.result(5), "B")
+        self.assertEqual([texts for texts, _ in held.batches], [["b"]])
+
+    def test_cancel_after_batching_still_delivers_the_rest(self):
+        held = HeldBatches()
+        batcher = MicroBatcher(held, max_wait_ms=0)
+        first = batcher.submit("Sony", "a")
+        self.assertTrue(held.submitted.wait(5))
+        self.assertFalse(first.cancel())
+        held.release()
+
+        self.assertEqual(first.result(5), "A")
+
+    def test_failed_batch_fails_every_text(self):
+        batcher = MicroBatcher(lambda brand, texts: 1 / 0, max_wait_ms=50)
+        futures = [batcher.submit("Sony", text) for text in ("a", "b")]
+        for future in futures:
+            with self.assertRaises(ZeroDivisionError):
+                future.result(5)
+
+
+if __name__ == "__main__":
+    unittest.main()